@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# ====================================================
+# Batch Execution
+# ====================================================
+
+class BatchResult:
+    """Outcome of one task in a batch: its return value or the error it raised."""
+    def __init__(self, key, value=None, error=None, elapsed=0.0):
+        self.key = key
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def _timed_call(func, args):
+    start = time.perf_counter()
+    try:
+        return func(*args), None, time.perf_counter() - start
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+
+def _process_context():
+    """
+    Start method for worker processes. Batches are started from threaded
+    servers, and a forked child can inherit a lock some other thread held
+    at the time, so fresh interpreters are used instead of fork.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def default_workers(task_count):
+    return max(1, min(task_count, os.cpu_count() or 1))
+
+def run_batch(func, tasks, max_workers=None, use_processes=True, on_result=None):
+    """
+    Runs ``func(*args)`` for every ``key -> args`` item in ``tasks`` on a
+    worker pool and returns one BatchResult per task, in task order. A task
+    that raises is recorded as failed without stopping the rest of the batch.
+    ``func`` must be a module-level function when ``use_processes`` is set.
+    ``on_result`` is called with each BatchResult as it completes.
+    """
+    tasks = list(tasks.items()) if isinstance(tasks, dict) else list(tasks)
+    max_workers = max_workers or default_workers(len(tasks))
+    results = {}
+
+    def record(key, value=None, error=None, elapsed=0.0):
+        results[key] = BatchResult(key, value, error, elapsed)
+        if on_result:
+            on_result(results[key])
+
+    if max_workers <= 1 or len(tasks) <= 1:
+        for key, args in tasks:
+            record(key, *_timed_call(func, args))
+    else:
+        if use_processes:
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=_process_context())
+        else:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        with executor:
+            futures = {executor.submit(_timed_call, func, args): key for key, args in tasks}
+            for future in as_completed(futures):
+                try:
+                    record(futures[future], *future.result())
+                except Exception as e:
+                    # The worker itself died or the result could not be sent back
+                    record(futures[future], error=str(e))
+    return [results[key] for key, _ in tasks]
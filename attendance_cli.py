@@ -0,0 +1,109 @@
+"""
+Headless batch attendance generation.
+
+    python attendance_cli.py "logs/*.csv" --sessions sessions.csv --output-dir out
+
+The session config uses the same "File / Session Start / Session End /
+Time Required" columns the GUI loads. Rows with a File value apply to the
+log with that name (or path); rows without one apply to every log. Each
+log is written to <name>_processed.xlsx and a per-file timing summary is
+printed. The exit status is non-zero if any file failed.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from attendance_processing import process_attendance_file, read_session_config
+from attendance_batch import run_batch
+
+def collect_files(patterns):
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files.extend(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    return list(dict.fromkeys(files))
+
+def sessions_for_file(file_path, sessions):
+    """Sessions whose File is blank or names this log, by base name or path."""
+    names = {os.path.basename(file_path), file_path}
+    selected = []
+    for session in sessions:
+        target = session["file"]
+        if target is None or target in names or os.path.abspath(target) == file_path:
+            selected.append({key: session[key] for key in ("session_start", "session_end", "time_required")})
+    return selected
+
+def build_tasks(files, sessions, output_dir=None, cache_dir=None):
+    """
+    Returns ({file: args for process_attendance_file}, {file: error}). A
+    log whose report path is already taken by an earlier log (same base
+    name with --output-dir) fails instead of overwriting that report.
+    """
+    tasks, errors, outputs = {}, {}, {}
+    for file_path in files:
+        file_sessions = sessions_for_file(file_path, sessions)
+        if not file_sessions:
+            errors[file_path] = "No sessions configured for this file."
+            continue
+        if any(s["session_start"] >= s["session_end"] for s in file_sessions):
+            errors[file_path] = "Session Start must be before Session End."
+            continue
+        name_part, _ = os.path.splitext(os.path.basename(file_path))
+        out_dir = output_dir or os.path.dirname(file_path)
+        output_file = os.path.join(out_dir, name_part + "_processed.xlsx")
+        output_key = os.path.normcase(os.path.abspath(output_file))
+        if output_key in outputs:
+            errors[file_path] = f"Report {output_file} is already written for {outputs[output_key]}."
+            continue
+        outputs[output_key] = file_path
+        tasks[file_path] = (file_path, file_sessions, output_file, cache_dir)
+    return tasks, errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate attendance reports for many Zoom logs.")
+    parser.add_argument("patterns", nargs="+", help="Zoom participant CSV files or glob patterns")
+    parser.add_argument("-s", "--sessions", required=True, help="session config CSV")
+    parser.add_argument("-o", "--output-dir", help="where to write reports (default: next to each log)")
+    parser.add_argument("-w", "--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--cache-dir", help="reuse parsed logs across runs from this directory")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print failures and the totals")
+    args = parser.parse_args(argv)
+
+    try:
+        sessions = read_session_config(args.sessions)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if not sessions:
+        print("Error: No valid session configurations found in the CSV file.", file=sys.stderr)
+        return 2
+    # A pattern like *.csv would otherwise pick up the session config itself.
+    files = [f for f in collect_files(args.patterns) if f != os.path.abspath(args.sessions)]
+    if not files:
+        print("Error: No CSV files matched.", file=sys.stderr)
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    tasks, errors = build_tasks(files, sessions, args.output_dir, args.cache_dir)
+    started = time.perf_counter()
+    results = run_batch(process_attendance_file, tasks, max_workers=args.workers) if tasks else []
+    wall = time.perf_counter() - started
+
+    for result in results:
+        if not result.ok:
+            errors[result.key] = result.error
+        elif not args.quiet:
+            print(f"OK    {result.elapsed:8.2f}s  {result.key} -> {tasks[result.key][2]}")
+            for line in result.value:
+                print(f"          {line}")
+    for file_path, error in errors.items():
+        print(f"FAIL  {file_path}: {error}", file=sys.stderr)
+    succeeded = len(files) - len(errors)
+    print(f"{succeeded}/{len(files)} files processed in {wall:.2f}s")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from attendance_batch import run_batch
+
+# ====================================================
+# Job Store
+# ====================================================
+
+JOB_DB_NAME = "jobs.sqlite3"
+JOB_MAX_AGE_DAYS = 7
+JOB_STATES = ("queued", "running", "done", "failed")
+# Queues touch their unfinished jobs this often; a job left untouched for
+# JOB_STALE_SECONDS belonged to a process that is gone and is reported failed.
+JOB_HEARTBEAT_SECONDS = 10
+JOB_STALE_SECONDS = 60
+# A job whose process is alive but that has not started or finished a task
+# for this long is assumed hung (a stuck worker) and is reported failed.
+JOB_PROGRESS_TIMEOUT_SECONDS = 30 * 60
+
+class JobStore:
+    """
+    Status, progress and results of background batch jobs, kept in SQLite
+    under ``directory`` so any web worker can answer a status poll.
+    """
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, JOB_DB_NAME)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                         "id TEXT PRIMARY KEY, status TEXT NOT NULL, done INTEGER NOT NULL, "
+                         "total INTEGER NOT NULL, results TEXT, error TEXT, "
+                         "created REAL NOT NULL, updated REAL NOT NULL, progressed REAL NOT NULL)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "progressed" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN progressed REAL NOT NULL DEFAULT 0")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, total):
+        """Adds a queued job of ``total`` tasks and returns its id; drops old jobs."""
+        job_id, now = uuid.uuid4().hex, time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT INTO jobs (id, status, done, total, results, error, created, updated, progressed) "
+                         "VALUES (?, 'queued', 0, ?, '[]', NULL, ?, ?, ?)", (job_id, total, now, now, now))
+            conn.execute("DELETE FROM jobs WHERE updated < ?", (now - JOB_MAX_AGE_DAYS * 86400,))
+        return job_id
+
+    def update(self, job_id, **fields):
+        """
+        Sets ``fields`` on a job that is still queued or running; a job
+        already reported failed (stale or hung) keeps that outcome. Changing
+        status or done counts as progress.
+        """
+        if "status" in fields and fields["status"] not in JOB_STATES:
+            raise ValueError(f"Unknown job status '{fields['status']}'. Expected one of {JOB_STATES}.")
+        if "results" in fields:
+            fields["results"] = json.dumps(fields["results"])
+        now = time.time()
+        if "status" in fields or "done" in fields:
+            fields["progressed"] = now
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE jobs SET {columns}, updated = ? WHERE id = ? "
+                         "AND status IN ('queued', 'running')", (*fields.values(), now, job_id))
+
+    def get(self, job_id):
+        """The job as a dict, or None if there is no such job."""
+        self._fail_if_stale(job_id)
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["results"] = json.loads(job["results"] or "[]")
+        return job
+
+    def touch(self, job_ids):
+        """Marks unfinished jobs as still owned by a live queue."""
+        if not job_ids:
+            return
+        marks = ", ".join("?" * len(job_ids))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE jobs SET updated = ? WHERE id IN ({marks}) "
+                         "AND status IN ('queued', 'running')", (time.time(), *job_ids))
+
+    def _fail_if_stale(self, job_id):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? "
+                         "WHERE id = ? AND status IN ('queued', 'running') AND updated < ?",
+                         ("The server stopped before this job finished.", now, job_id,
+                          now - JOB_STALE_SECONDS))
+            conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? "
+                         "WHERE id = ? AND status IN ('queued', 'running') AND progressed < ?",
+                         (f"No file finished processing in {JOB_PROGRESS_TIMEOUT_SECONDS // 60} minutes; "
+                          "a worker may be stuck.", now, job_id, now - JOB_PROGRESS_TIMEOUT_SECONDS))
+
+# ====================================================
+# Job Queue
+# ====================================================
+
+def _result_record(result):
+    return {"key": result.key, "ok": result.ok, "value": result.value,
+            "error": result.error, "elapsed": round(result.elapsed, 3)}
+
+class JobQueue:
+    """
+    Runs batches in the background: ``submit`` records a job and returns its
+    id at once, and a dispatcher thread later runs the batch through
+    run_batch, recording per-task progress in the store as tasks finish.
+    Task values must be JSON serializable. A heartbeat thread keeps the
+    queue's unfinished jobs fresh in the store, so other processes sharing
+    it can tell them from jobs whose process has gone.
+    """
+    def __init__(self, store, max_jobs=1, batch_workers=None):
+        self.store = store
+        self.batch_workers = batch_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="attendancify-job")
+        self._unfinished = set()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._heartbeat, name="attendancify-job-heartbeat", daemon=True).start()
+
+    def submit(self, func, tasks):
+        tasks = list(tasks.items()) if isinstance(tasks, dict) else list(tasks)
+        job_id = self.store.create(len(tasks))
+        with self._lock:
+            self._unfinished.add(job_id)
+        self._executor.submit(self._run, job_id, func, tasks)
+        return job_id
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            with self._lock:
+                job_ids = list(self._unfinished)
+            try:
+                self.store.touch(job_ids)
+            except sqlite3.Error:
+                pass
+
+    def _run(self, job_id, func, tasks):
+        try:
+            self._run_batch(job_id, func, tasks)
+        finally:
+            with self._lock:
+                self._unfinished.discard(job_id)
+
+    def _run_batch(self, job_id, func, tasks):
+        self.store.update(job_id, status="running")
+        finished = []
+
+        def on_result(result):
+            finished.append(_result_record(result))
+            self.store.update(job_id, done=len(finished), results=finished)
+
+        try:
+            results = run_batch(func, tasks, max_workers=self.batch_workers, on_result=on_result)
+        except Exception as e:
+            self.store.update(job_id, status="failed", error=str(e))
+            return
+        # Stored in task order, not completion order
+        self.store.update(job_id, status="done", done=len(results),
+                          results=[_result_record(result) for result in results])
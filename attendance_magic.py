@@ -1,12 +1,15 @@
 import os
-import csv
-import math
 import threading
 import time
-from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 from difflib import get_close_matches
 
+from attendance_processing import (
+    parse_datetime, process_attendance_file, read_session_config
+)
+from attendance_batch import run_batch
+
 # GUI-related imports will be imported locally in functions that need them
 # import tkinter as tk
 # from tkinter import filedialog, messagebox
@@ -17,12 +20,6 @@ from difflib import get_close_matches
 # Helper Functions
 # ====================================================
 
-def format_time(time_in_minutes):
-    """Converts a float (minutes) to a string 'M minutes S seconds'."""
-    minutes = int(math.floor(time_in_minutes))
-    seconds = int(round((time_in_minutes - minutes) * 60))
-    return f"{minutes} minutes {seconds} seconds"
-
 class AutocompleteCombobox(ttk.Combobox):
     """
     A combobox that provides autocomplete suggestions based on a provided list.
@@ -44,235 +41,62 @@ class AutocompleteCombobox(ttk.Combobox):
         data = self._completion_list if not value else [item for item in self._completion_list if item.lower().startswith(value.lower())]
         self['values'] = data
 
-def get_column(df, candidates, col_description="column"):
-    for candidate in candidates:
-        if candidate in df.columns:
-            return candidate
-    raise ValueError(f"CSV file must contain one of the following {col_description}: {', '.join(candidates)}")
-
-def parse_datetime(dt_str):
-    try:
-        return datetime.strptime(dt_str.strip(), '%Y-%m-%d %H:%M:%S')
-    except Exception:
-        raise ValueError(f"Invalid datetime format: {dt_str}. Expected format: YYYY-MM-DD HH:MM:SS")
-
-def merge_intervals(intervals):
-    if not intervals:
-        return []
-    intervals.sort(key=lambda x: x[0])
-    merged = [intervals[0]]
-    for current in intervals[1:]:
-        last = merged[-1]
-        if current[0] <= last[1]:
-            merged[-1] = (last[0], max(last[1], current[1]))
-        else:
-            merged.append(current)
-    return merged
-
-def compute_total_duration(intervals):
-    total = timedelta()
-    for start, end in intervals:
-        total += (end - start)
-    return total.total_seconds() / 60
-
-def intersect_interval(interval, period):
-    start, end = interval
-    p_start, p_end = period
-    new_start = max(start, p_start)
-    new_end = min(end, p_end)
-    return (new_start, new_end) if new_start < new_end else None
-
-def get_global_times(file_path):
-    try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
-    except Exception as e:
-        raise ValueError(f"Error reading file '{file_path}' for global times: {e}")
-    name_col = get_column(df, ["Name", "Name (Original Name)", "Name (original name)"], "name column")
-    join_col = get_column(df, ["Join Time", "Join time"], "Join Time")
-    leave_col = get_column(df, ["Leave Time", "Leave time"], "Leave Time")
-    try:
-        df[join_col] = pd.to_datetime(df[join_col])
-        df[leave_col] = pd.to_datetime(df[leave_col])
-    except Exception as e:
-        raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
-    df["Name_lower"] = df[name_col].str.lower()
-    global_times = {}
-    for name_lower, group in df.groupby("Name_lower"):
-        global_times[name_lower] = (group[join_col].min(), group[leave_col].max())
-    return global_times
-
-def get_total_durations(file_path):
-    try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
-        name_col = get_column(df, ["Name", "Name (Original Name)", "Name (original name)"], "name column")
-        duration_col = get_column(df, ["Duration", "Duration (minutes)"], "duration column")
-        df[duration_col] = pd.to_numeric(df[duration_col], errors="coerce")
-        df["Name_lower"] = df[name_col].str.lower()
-        return df.groupby("Name_lower")[duration_col].sum().to_dict()
-    except Exception as e:
-        raise ValueError(f"Error computing total durations from '{file_path}': {e}")
-
-def process_csv_session(file_path, session_start, session_end, time_required):
-    try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
-    except Exception as e:
-        raise ValueError(f"Error reading file '{file_path}': {e}")
-    name_col = get_column(df, ["Name", "Name (Original Name)", "Name (original name)"], "name column")
-    email_col = get_column(df, ["Email", "User Email"], "Email")
-    join_col = get_column(df, ["Join Time", "Join time"], "Join Time")
-    leave_col = get_column(df, ["Leave Time", "Leave time"], "Leave Time")
-    try:
-        df[join_col] = pd.to_datetime(df[join_col])
-        df[leave_col] = pd.to_datetime(df[leave_col])
-    except Exception as e:
-        raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
-    df["Name_lower"] = df[name_col].str.lower()
-    session_results = {}
-    for name_lower, group in df.groupby("Name_lower"):
-        original_name = group.iloc[0][name_col]
-        email = group.iloc[0][email_col]
-        intervals = [(row[join_col], row[leave_col]) for _, row in group.iterrows()]
-        merged = merge_intervals(intervals)
-        session_intervals = [intersect_interval(interval, (session_start, session_end))
-                             for interval in merged if intersect_interval(interval, (session_start, session_end))]
-        session_intervals = merge_intervals(session_intervals)
-        session_duration = compute_total_duration(session_intervals)
-        if session_duration >= time_required:
-            status = "P"
-            shortfall = 0
-        else:
-            status = "A"
-            shortfall = round(time_required - session_duration, 2)
-        session_results[name_lower] = {
-            "Name": original_name,
-            "Email": email,
-            "session_duration": session_duration,
-            "status": status,
-            "shortfall": shortfall
-        }
-    return session_results
-
-def process_sessions_for_file(file_path, sessions_info):
-    global_participants = {}
-    total_sessions = len(sessions_info)
-    session_labels = []
-    for session_index, session in enumerate(sessions_info, start=1):
-        try:
-            session_results = process_csv_session(file_path, session["session_start"], session["session_end"], session["time_required"])
-            session_global_times = get_global_times(file_path)
-        except ValueError as ve:
-            raise ValueError(str(ve))
-        for name_lower, details in session_results.items():
-            if name_lower not in session_global_times:
-                continue
-            g_join, g_leave = session_global_times[name_lower]
-            session_detail = {
-                "status": details["status"],
-                "shortfall": details["shortfall"],
-                "session_duration": details["session_duration"]
-            }
-            if name_lower not in global_participants:
-                global_participants[name_lower] = {
-                    "Name": details["Name"],
-                    "Email": details["Email"],
-                    "global_join": g_join,
-                    "global_leave": g_leave,
-                    "total_duration": details["session_duration"],
-                    "sessions": {session_index: session_detail}
-                }
-            else:
-                curr = global_participants[name_lower]
-                curr["global_join"] = min(curr["global_join"], g_join)
-                curr["global_leave"] = max(curr["global_leave"], g_leave)
-                curr["total_duration"] += details["session_duration"]
-                curr["sessions"][session_index] = session_detail
-        session_labels.append(f"Session {session_index} ({session['session_start'].strftime('%Y-%m-%d %H:%M:%S')})")
-    for participant in global_participants.values():
-        for i in range(1, total_sessions + 1):
-            if i not in participant["sessions"]:
-                req = sessions_info[i-1]["time_required"]
-                participant["sessions"][i] = {"status": "A", "shortfall": req, "session_duration": 0}
-    try:
-        raw_durations = get_total_durations(file_path)
-    except Exception as e:
-        raise ValueError(str(e))
-    for name_lower, participant in global_participants.items():
-        if name_lower in raw_durations:
-            participant["total_duration"] = raw_durations[name_lower]
-    output_records = []
-    for participant in global_participants.values():
-        record = {
-            "Name": participant["Name"],
-            "Email": participant["Email"],
-            "Join Time": participant["global_join"].strftime('%Y-%m-%d %H:%M:%S'),
-            "Leave Time": participant["global_leave"].strftime('%Y-%m-%d %H:%M:%S')
-        }
-        for i in range(1, total_sessions + 1):
-            record[session_labels[i-1]] = participant["sessions"][i]["status"]
-        record["Total Duration"] = round(participant["total_duration"], 2)
-        breakdown_msgs = []
-        for i in range(1, total_sessions + 1):
-            sess = participant["sessions"][i]
-            if sess["status"] == "A":
-                req = sessions_info[i-1]["time_required"]
-                computed = sess["session_duration"]
-                breakdown_msgs.append(f"User duration is just {format_time(computed)} out of {format_time(req)} minutes, which is why marking absent in {session_labels[i-1]}")
-        record["Shortfall Reason"] = "; ".join(breakdown_msgs) if breakdown_msgs else ""
-        output_records.append(record)
-    session_summary = []
-    for i in range(1, total_sessions + 1):
-        present_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, {}).get("status", "A") == "P")
-        absent_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, {}).get("status", "A") == "A")
-        session_summary.append(f"Session {i}: Present: {present_count}, Absent: {absent_count}")
-    return output_records, session_labels, session_summary
-
-def write_excel(raw_log_df, output_records, output_file):
-    try:
-        with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-            raw_log_df.to_excel(writer, sheet_name="Sheet1", index=False, header=False)
-            pd.DataFrame(output_records).to_excel(writer, sheet_name="Attendance", index=False)
-    except Exception as e:
-        raise ValueError(f"Error saving output Excel file: {e}")
+class ZoomNameIndex:
+    """
+    Token and exact-name lookups over the zoom names, built once so each
+    main name is matched without scanning the whole list. Gives the same
+    answers as scanning the names in order.
+    """
+    def __init__(self, zoom_names):
+        self.names = [name for name in zoom_names if isinstance(name, str)]
+        self.exact = set(self.names)
+        self.tokens = {}
+        for position, name in enumerate(self.names):
+            for token in set(name.lower().split()):
+                self.tokens.setdefault(token, []).append(position)
+
+    def match(self, main_name):
+        if main_name in self.exact:
+            return main_name
+        main_parts = main_name.lower().split()
+        if not main_parts:
+            return None
+        with_first = self.tokens.get(main_parts[0], ())
+        if len(main_parts) == 1:
+            return self.names[with_first[0]] if with_first else None
+        with_last = set(self.tokens.get(main_parts[-1], ()))
+        # Positions are in list order, so the first hit is the earliest name holding both tokens.
+        position = next((p for p in with_first if p in with_last), None)
+        return None if position is None else self.names[position]
 
 def match_names_v4(main_name, zoom_names):
-    valid_zoom_names = [name for name in zoom_names if isinstance(name, str)]
-    if main_name in valid_zoom_names:
-        return main_name
-    main_parts = main_name.lower().split()
-    for zoom_name in valid_zoom_names:
-        zoom_parts = zoom_name.lower().split()
-        if len(main_parts) >= 2:
-            if main_parts[0] in zoom_parts and main_parts[-1] in zoom_parts:
-                return zoom_name
-        if len(main_parts) == 1 and main_parts[0] in zoom_parts:
-            return zoom_name
-    return None
+    return ZoomNameIndex(zoom_names).match(main_name)
 
 def process_file_match(input_path, output_path, silent=False):
     df = pd.read_excel(input_path)
     df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
     main_list = df.iloc[:, 1]
     zoom_log_names = df.iloc[:, 2]
-    arranged_data_v4 = df.iloc[:, :2].copy()
-    for col in df.columns[2:]:
-        arranged_data_v4[col] = 'N/A'
-    unmatched_zoom_log_v4 = []
+    name_index = ZoomNameIndex(zoom_log_names)
+    first_row = {}
+    for position, zoom_name in enumerate(zoom_log_names):
+        if not pd.isna(zoom_name):
+            first_row.setdefault(zoom_name, position)
+    values = df.iloc[:, 2:].to_numpy(dtype=object)
+    arranged_values = np.full(values.shape, 'N/A', dtype=object)
     for index, main_name in enumerate(main_list):
         if pd.isna(main_name):
             continue
-        matched_name = match_names_v4(main_name, zoom_log_names)
+        matched_name = name_index.match(main_name)
         if matched_name:
-            matched_row = df[df.iloc[:, 2] == matched_name].iloc[0]
-            arranged_data_v4.iloc[index, 2:] = matched_row.iloc[2:]
-    for zoom_name in zoom_log_names:
-        if pd.isna(zoom_name) or zoom_name in arranged_data_v4.iloc[:, 2].values:
-            continue
-        unmatched_row = df[df.iloc[:, 2] == zoom_name].iloc[0]
-        unmatched_zoom_log_v4.append(unmatched_row)
-    unmatched_df = pd.DataFrame(unmatched_zoom_log_v4)
+            arranged_values[index] = values[first_row[matched_name]]
+    arranged_data_v4 = df.iloc[:, :2].copy()
+    for position, col in enumerate(df.columns[2:]):
+        arranged_data_v4[col] = arranged_values[:, position]
+    arranged_names = set(arranged_values[:, 0]) if len(arranged_values) else set()
+    unmatched_rows = [first_row[zoom_name] for zoom_name in zoom_log_names
+                      if not pd.isna(zoom_name) and zoom_name not in arranged_names]
+    unmatched_df = df.iloc[unmatched_rows] if unmatched_rows else pd.DataFrame([])
     with pd.ExcelWriter(output_path) as writer:
         arranged_data_v4.to_excel(writer, index=False, sheet_name="Matched Records")
         unmatched_df.to_excel(writer, index=False, sheet_name="Unmatched Records")
@@ -433,23 +257,11 @@ class AttendanceGeneratorApp:
         if not file_path:
             return
         try:
-            df = pd.read_csv(file_path)
-            df.columns = df.columns.str.strip()
-            required_cols = ["Session Start", "Session End", "Time Required"]
-            for col in required_cols:
-                if col not in df.columns:
-                    raise ValueError(f"Session Config CSV must contain column '{col}'.")
-            has_file = "File" in df.columns
             options = []
             mapping = {}
-            for _, row in df.iterrows():
-                try:
-                    session_start = parse_datetime(row["Session Start"])
-                    session_end = parse_datetime(row["Session End"])
-                    time_required = float(row["Time Required"])
-                    file_val = row["File"] if has_file else None
-                except Exception:
-                    continue
+            for session in read_session_config(file_path):
+                session_start, session_end = session["session_start"], session["session_end"]
+                time_required, file_val = session["time_required"], session["file"]
                 display = (f"{file_val} | " if file_val else "") + f"{session_start.strftime('%Y-%m-%d %H:%M:%S')} to {session_end.strftime('%Y-%m-%d %H:%M:%S')} ({time_required} min)"
                 options.append(display)
                 mapping[display] = (session_start, session_end, time_required, file_val)
@@ -581,29 +393,14 @@ class AttendanceGeneratorApp:
                             "session_end": e_dt,
                             "time_required": time_req_val
                         })
-                    try:
-                        output_records, session_labels, session_summary = process_sessions_for_file(self.selected_file, sessions_info)
-                    except ValueError as ve:
-                        self.master.after(0, lambda: messagebox.showerror("Error", str(ve)))
-                        return
-                    try:
-                        with open(self.selected_file, 'r', encoding='utf-8') as f:
-                            sample = f.read(1024)
-                            f.seek(0)
-                            dialect = csv.Sniffer().sniff(sample)
-                            raw_data = list(csv.reader(f, dialect))
-                        raw_log_df = pd.DataFrame(raw_data)
-                    except Exception as e:
-                        self.master.after(0, lambda: messagebox.showerror("Error", f"Error reading raw log from '{self.selected_file}': {e}"))
-                        return
                     base = os.path.basename(self.selected_file)
                     name_part, _ = os.path.splitext(base)
                     # Automatically use same folder and same name with suffix
                     output_file = os.path.join(os.path.dirname(self.selected_file), name_part + "_processed.xlsx")
                     try:
-                        write_excel(raw_log_df, output_records, output_file)
-                    except ValueError as e:
-                        self.master.after(0, lambda: messagebox.showerror("Error", str(e)))
+                        session_summary = process_attendance_file(self.selected_file, sessions_info, output_file)
+                    except ValueError as ve:
+                        self.master.after(0, lambda: messagebox.showerror("Error", str(ve)))
                         return
                     summary_str = "\n".join(session_summary)
                     self.master.after(0, lambda: messagebox.showinfo("Attendance Generated",
@@ -640,33 +437,23 @@ class AttendanceGeneratorApp:
                     if not sessions_by_file:
                         self.master.after(0, lambda: messagebox.showerror("Error", "No session information available."))
                         return
-                    summary_all = {}
+                    tasks = {}
                     for file_path, sessions_info in sessions_by_file.items():
-                        try:
-                            output_records, session_labels, session_summary = process_sessions_for_file(file_path, sessions_info)
-                        except ValueError as ve:
-                            self.master.after(0, lambda: messagebox.showerror("Error", str(ve)))
-                            return
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                sample = f.read(1024)
-                                f.seek(0)
-                                dialect = csv.Sniffer().sniff(sample)
-                                raw_data = list(csv.reader(f, dialect))
-                            raw_log_df = pd.DataFrame(raw_data)
-                        except Exception as e:
-                            self.master.after(0, lambda: messagebox.showerror("Error", f"Error reading raw log from '{file_path}': {e}"))
-                            return
-                        base = os.path.basename(file_path)
-                        name_part, _ = os.path.splitext(base)
+                        name_part, _ = os.path.splitext(os.path.basename(file_path))
                         # Save automatically with suffix _processed.xlsx
                         output_file = os.path.join(os.path.dirname(file_path), name_part + "_processed.xlsx")
-                        try:
-                            write_excel(raw_log_df, output_records, output_file)
-                        except ValueError as e:
-                            self.master.after(0, lambda: messagebox.showerror("Error", f"Error saving output Excel file for {base}: {e}"))
-                            return
-                        summary_all[base] = "\n".join(session_summary)
+                        tasks[file_path] = (file_path, sessions_info, output_file)
+                    summary_all = {}
+                    errors = []
+                    for result in run_batch(process_attendance_file, tasks):
+                        base = os.path.basename(result.key)
+                        if result.ok:
+                            summary_all[base] = "\n".join(result.value)
+                        else:
+                            errors.append(f"{base}: {result.error}")
+                    if errors:
+                        error_str = "\n".join(errors)
+                        self.master.after(0, lambda: messagebox.showerror("Error", f"Some files could not be processed:\n{error_str}"))
                     summary_str = "\n\n".join([f"{fname}:\n{summary}" for fname, summary in summary_all.items()])
                     self.master.after(0, lambda: messagebox.showinfo("Attendance Generated",
                                                     f"Processed {len(summary_all)} files.\n\nAttendance Summary:\n{summary_str}"))
@@ -0,0 +1,697 @@
+import os
+import re
+import time
+import hashlib
+import sqlite3
+from contextlib import closing
+from itertools import islice
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+from rapidfuzz import fuzz, process
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:  # optional: "optimal" assignment falls back to greedy without scipy
+    linear_sum_assignment = None
+
+# ====================================================
+# Name Normalization
+# ====================================================
+
+def normalize_name(name: str) -> str:
+    if not isinstance(name, str):
+        name = str(name)
+    name = re.sub(r"[^\w\s]", "", name)
+    name = re.sub(r"\s+", " ", name)
+    return name.strip().lower()
+
+# ====================================================
+# Raw Sheet Extraction
+# ====================================================
+
+SHEET_NAME = "Attendance"
+# Rows read in full to find the name and session columns; the rest of the
+# sheet is streamed with only those columns kept.
+RAW_SAMPLE_ROWS = 500
+
+def _excel_cell(value):
+    """Converts a cell value the way pandas' openpyxl reader does."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in ERROR_CODES:
+        return np.nan
+    return value
+
+def _sheet_rows(sheet):
+    """Rows of converted cells with trailing blanks trimmed, as read_excel sees them."""
+    for row in sheet.iter_rows(values_only=True):
+        row = [_excel_cell(value) for value in row]
+        while row and row[-1] == "":
+            row.pop()
+        yield row
+
+def _parse_rows(rows, names=None):
+    """Runs rows through pandas' own text parser so NA handling and header naming match read_excel."""
+    width = max((len(row) for row in rows), default=0)
+    if names is not None:
+        width = max(width, len(names))
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    if names is None:
+        return TextParser(rows, header=0, skip_blank_lines=False).read()
+    return TextParser(rows, names=names, header=None, skip_blank_lines=False).read()
+
+def _is_session_column(values):
+    present = values.dropna()
+    return len(present) > 0 and present.astype(str).str.strip().str.upper().isin(("P", "A")).all()
+
+def extract_raw_from_excel(xl_path):
+    """
+    Reads the "Attendance" sheet into Name plus session columns, with
+    anything other than P/A replaced by "N/A". The sheet is streamed in
+    read-only mode: session columns (all P/A, or headed "Session" as a
+    fallback) are found from the first RAW_SAMPLE_ROWS rows and only the
+    chosen columns are kept from the rest.
+    """
+    workbook = load_workbook(xl_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        # Always extract sheet named "Attendance"
+        if SHEET_NAME not in workbook.sheetnames:
+            raise ValueError(f"Sheet '{SHEET_NAME}' not found in the file.")
+        sheet = workbook[SHEET_NAME]
+        sheet.reset_dimensions()
+        rows = _sheet_rows(sheet)
+        head = list(islice(rows, RAW_SAMPLE_ROWS + 1))
+        sample = _parse_rows(head) if any(head) else pd.DataFrame()
+        name_col = next((c for c in sample.columns if str(c).strip().lower() in ("name", "participant name")), None)
+        if not name_col:
+            raise ValueError("No 'Name' column found.")
+        session_cols = [c for c in sample.columns if _is_session_column(sample[c])]
+        # Fallback for cases session columns have headers with "Session" or contain P/A markers
+        if not session_cols:
+            session_cols = [c for c in sample.columns if "session" in str(c).lower()]
+        positions = [sample.columns.get_loc(c) for c in [name_col] + session_cols]
+        data, last_with_data = [], -1
+        for row in head[1:]:
+            if row:
+                last_with_data = len(data)
+            data.append([row[i] if i < len(row) else "" for i in positions])
+        for row in rows:
+            if row:
+                last_with_data = len(data)
+            data.append([row[i] if i < len(row) else "" for i in positions])
+    finally:
+        workbook.close()
+    out = _parse_rows(data[:last_with_data + 1], names=list(range(len(positions))))
+    out.columns = ["Name"] + [str(c) for c in session_cols]
+    if not session_cols:
+        return out
+    # Only keep "P"/"A", replace anything else with "N/A"
+    values = out.iloc[:, 1:].to_numpy(dtype=object)
+    keep = np.isin(np.char.upper(np.char.strip(values.astype(str))), ("P", "A"))
+    out[out.columns[1:]] = np.where(keep, values, "N/A")
+    return out
+
+def write_raw_excel(xl_path, output_path):
+    """extract_raw_from_excel written to ``output_path``; a module-level task for worker pools."""
+    extract_raw_from_excel(xl_path).to_excel(output_path, index=False)
+    return output_path
+
+# ====================================================
+# Master / Raw Matching
+# ====================================================
+
+# Minimum token_set_ratio for a raw name to count as a master name's match.
+MATCH_THRESHOLD = 85
+# Master rows scored per cdist call, so the score block stays small
+# however large the rosters get.
+MATCH_BLOCK_ROWS = 1024
+# Above this many raw names each master name is only scored against raw
+# names sharing a block key with it (see NameIndex); below it every pair is
+# scored, which is exact and already fast.
+BLOCKING_MIN_RAW = 2000
+# Master names with fewer candidates than this are scored against
+# every raw name instead, so typos in every token still find their match.
+# 0 turns the fallback off.
+BLOCKING_MIN_CANDIDATES = 1
+
+def block_keys(name):
+    """A normalized name's tokens plus each adjacent pair run together, so "mohammedyadav" still meets "mohammed yadav"."""
+    tokens = name.split()
+    return set(tokens).union(a + b for a, b in zip(tokens, tokens[1:]))
+
+# How find_matches pairs master and raw rows; see find_matches.
+ASSIGNMENT_MODES = ("best", "greedy", "optimal")
+# Largest component (rows on either side) solved exactly in "optimal" mode.
+OPTIMAL_MAX_COMPONENT = 2000
+
+class NameIndex:
+    """Inverted index from block keys to the raw rows containing them."""
+    def __init__(self, names):
+        self.names = list(names)
+        postings = {}
+        for i, name in enumerate(self.names):
+            for key in block_keys(name):
+                postings.setdefault(key, []).append(i)
+        self.postings = {key: np.array(rows, dtype=np.int64) for key, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, name, keys=None):
+        """Sorted indices of the names sharing at least one block key with ``name`` (or ``keys``)."""
+        keys = block_keys(name) if keys is None else keys
+        lists = [self.postings[key] for key in keys if key in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        return lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+
+# Raw sheets may carry an email column; it is used for matching, not as a session.
+RAW_EMAIL_COLUMNS = ("email", "email_id", "user email", "email address")
+
+def read_raw_file(raw_path: str) -> pd.DataFrame:
+    df = pd.read_csv(raw_path) if raw_path.lower().endswith(".csv") else pd.read_excel(raw_path)
+    df.columns = [str(c).strip() for c in df.columns]
+    name_col = next((c for c in df.columns if c.lower() in ("name", "participant name")), None)
+    if name_col is None:
+        raise ValueError("Raw file needs a 'Name' column.")
+    email_col = next((c for c in df.columns if c.lower() in RAW_EMAIL_COLUMNS and c != name_col), None)
+    session_cols = [c for c in df.columns if c not in (name_col, email_col)]
+    if not session_cols:
+        raise ValueError("Raw file contains no session/status columns.")
+    block = df[session_cols].to_numpy(dtype=object)
+    df[session_cols] = np.where(np.isin(block.astype(str), ("P", "A")), block, "N/A")
+    key_cols = [name_col] + ([email_col] if email_col else [])
+    out = df[key_cols + session_cols].copy()
+    out.columns = ["Name"] + (["Email"] if email_col else []) + session_cols
+    return out
+
+def raw_session_columns(rdf):
+    return [c for c in rdf.columns if c not in ("Name", "Email")]
+
+ATTENDANCE_LABELS = {"P": "present", "A": "absent", "p": "present", "a": "absent"}
+
+def label_attendance(values):
+    """Maps P/A codes (either case) to present/absent over an object array; other values are kept."""
+    labeled = values.copy()
+    for code, label in ATTENDANCE_LABELS.items():
+        labeled[values == code] = label
+    return labeled
+
+def assemble_matches(mdf, rdf, session_cols, best):
+    """
+    Builds the Matched and Unmatched Raw frames in bulk: the raw session
+    block is labelled once, matched rows are taken from it by index and
+    master rows without a match get "N/A".
+    """
+    labeled = label_attendance(rdf[session_cols].to_numpy(dtype=object))
+    matched = best >= 0
+    values = np.full((len(mdf), len(session_cols)), "N/A", dtype=object)
+    values[matched] = labeled[best[matched]]
+    matched_df = mdf.reset_index(drop=True)
+    matched_df = pd.concat([matched_df, pd.DataFrame(values, columns=session_cols)], axis=1)
+    used = np.zeros(len(rdf), dtype=bool)
+    used[best[matched]] = True
+    unmatched_df = rdf.iloc[np.flatnonzero(~used)].copy()
+    unmatched_df[session_cols] = labeled[~used]
+    if not unmatched_df.empty:
+        unmatched_df.rename(columns={"Name": "Raw Name (not found in Master)"}, inplace=True)
+    return matched_df, unmatched_df
+
+def _score_all_pairs(master_names, raw_names, threshold, workers):
+    best = np.full(len(master_names), -1, dtype=np.int64)
+    if not len(master_names) or not len(raw_names):
+        return best
+    for start in range(0, len(master_names), MATCH_BLOCK_ROWS):
+        block = master_names[start:start + MATCH_BLOCK_ROWS]
+        scores = process.cdist(block, raw_names, scorer=fuzz.token_set_ratio, processor=None,
+                               score_cutoff=threshold, dtype=np.float64, workers=workers)
+        columns = scores.argmax(axis=1)
+        accepted = scores[np.arange(len(block)), columns] >= threshold
+        best[start:start + len(block)] = np.where(accepted, columns, -1)
+    return best
+
+def _score_blocked(master_names, index, threshold, min_candidates, workers, master_keys=None):
+    best = np.full(len(master_names), -1, dtype=np.int64)
+    fallback = []
+    for i, name in enumerate(master_names):
+        candidates = index.candidates(name, master_keys[i] if master_keys else None)
+        if len(candidates) < min_candidates:
+            fallback.append(i)
+            continue
+        if not len(candidates):
+            continue
+        match = process.extractOne(name, [index.names[j] for j in candidates], scorer=fuzz.token_set_ratio,
+                                   processor=None, score_cutoff=threshold)
+        if match is not None:
+            best[i] = candidates[match[2]]
+    if fallback:
+        best[fallback] = _score_all_pairs([master_names[i] for i in fallback], index.names, threshold, workers)
+    return best
+
+def best_matches(master_names, raw_names, threshold=MATCH_THRESHOLD, workers=-1, blocking=None,
+                 min_candidates=BLOCKING_MIN_CANDIDATES, master_keys=None):
+    """
+    For each normalized master name, the index of the raw name with the
+    highest token_set_ratio, or -1 if that score is below ``threshold``.
+    Ties go to the first raw name, as in a left-to-right scan.
+
+    With ``blocking`` (on by default above BLOCKING_MIN_RAW raw names) only
+    raw names sharing a block key are scored, and names with fewer than
+    ``min_candidates`` candidates fall back to scoring every raw name.
+    ``raw_names`` may be a prebuilt NameIndex and ``master_keys`` the
+    master names' precomputed block_keys.
+    """
+    index = raw_names if isinstance(raw_names, NameIndex) else None
+    names = index.names if index else raw_names
+    if blocking is None:
+        blocking = len(names) > BLOCKING_MIN_RAW
+    if not blocking:
+        return _score_all_pairs(master_names, names, threshold, workers)
+    return _score_blocked(master_names, index or NameIndex(names), threshold, min_candidates, workers, master_keys)
+
+def _normalize_email(value):
+    return value.strip().lower() if isinstance(value, str) else ""
+
+def _rows_by_key(keys):
+    """Maps each non-blank key to the rows holding it, in order."""
+    rows = {}
+    for i, key in enumerate(keys):
+        if key:
+            rows.setdefault(key, []).append(i)
+    return rows
+
+def exact_matches(master_names, master_emails, raw_names, raw_emails=None, one_to_one=False):
+    """
+    Hash-join pre-pass: matches master rows to raw rows by email (when the
+    raw sheet has one) and then by identical normalized name, taking the
+    first raw row for a repeated key. With ``one_to_one`` a raw row is
+    only given to one master row and repeated keys take the next free row.
+    Returns (raw index or -1, method) arrays, the method being "email",
+    "exact" or "".
+    """
+    best = np.full(len(master_names), -1, dtype=np.int64)
+    methods = np.full(len(master_names), "", dtype=object)
+    used = set()
+
+    def claim(i, rows, method):
+        for j in rows:
+            if not one_to_one or j not in used:
+                best[i], methods[i] = j, method
+                used.add(j)
+                return
+
+    if raw_emails is not None:
+        by_email = _rows_by_key(_normalize_email(e) for e in raw_emails)
+        for i, email in enumerate(master_emails):
+            claim(i, by_email.get(_normalize_email(email), ()), "email")
+    by_name = _rows_by_key(raw_names)
+    for i, name in enumerate(master_names):
+        if best[i] < 0:
+            claim(i, by_name.get(name, ()), "exact")
+    return best, methods
+
+def candidate_edges(master_names, raw_names, threshold=MATCH_THRESHOLD, workers=-1, blocking=None,
+                    min_candidates=BLOCKING_MIN_CANDIDATES, master_keys=None):
+    """
+    Every (master, raw) pair scoring at least ``threshold``, as parallel
+    (master index, raw index, score) arrays. Candidate pairs come from the
+    same blocking as best_matches; no dense score matrix is kept.
+    """
+    names = raw_names.names if isinstance(raw_names, NameIndex) else raw_names
+    rows, cols, scores = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0)]
+    if not len(master_names) or not len(names):
+        return rows[0], cols[0], scores[0]
+
+    def add_all_pairs(master_rows):
+        for start in range(0, len(master_rows), MATCH_BLOCK_ROWS):
+            block = np.asarray(master_rows[start:start + MATCH_BLOCK_ROWS], dtype=np.int64)
+            block_scores = process.cdist([master_names[i] for i in block], names, scorer=fuzz.token_set_ratio,
+                                         processor=None, score_cutoff=threshold, dtype=np.float64, workers=workers)
+            r, c = np.nonzero(block_scores >= threshold)
+            rows.append(block[r])
+            cols.append(c.astype(np.int64))
+            scores.append(block_scores[r, c])
+
+    if blocking is None:
+        blocking = len(names) > BLOCKING_MIN_RAW
+    if not blocking:
+        add_all_pairs(range(len(master_names)))
+    else:
+        index = raw_names if isinstance(raw_names, NameIndex) else NameIndex(names)
+        fallback = []
+        for i, name in enumerate(master_names):
+            candidates = index.candidates(name, master_keys[i] if master_keys else None)
+            if len(candidates) < min_candidates:
+                fallback.append(i)
+                continue
+            if not len(candidates):
+                continue
+            row_scores = process.cdist([name], [names[j] for j in candidates], scorer=fuzz.token_set_ratio,
+                                       processor=None, score_cutoff=threshold, dtype=np.float64)[0]
+            keep = np.flatnonzero(row_scores >= threshold)
+            rows.append(np.full(len(keep), i, dtype=np.int64))
+            cols.append(candidates[keep])
+            scores.append(row_scores[keep])
+        add_all_pairs(fallback)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+def greedy_assignment(rows, cols, scores, n_master):
+    """
+    One-to-one matching taking edges by descending score (ties to the
+    lower master, then raw index) while both ends are free.
+    """
+    best = np.full(n_master, -1, dtype=np.int64)
+    used = set()
+    for k in np.lexsort((cols, rows, -scores)):
+        i, j = rows[k], cols[k]
+        if best[i] < 0 and j not in used:
+            best[i] = j
+            used.add(j)
+    return best
+
+def optimal_assignment(rows, cols, scores, n_master, n_raw):
+    """
+    One-to-one matching maximizing the total score. The score graph is
+    split into connected components and linear_sum_assignment runs on each
+    one, so the dense matrices stay as small as the components. Components
+    larger than OPTIMAL_MAX_COMPONENT, or all of them without scipy, are
+    assigned greedily.
+    """
+    if linear_sum_assignment is None or not len(rows):
+        return greedy_assignment(rows, cols, scores, n_master)
+    graph = coo_matrix((np.ones(len(rows)), (rows, cols + n_master)), shape=(n_master + n_raw,) * 2)
+    _, labels = connected_components(graph, directed=False)
+    edge_labels = labels[rows]
+    order = np.argsort(edge_labels, kind="stable")
+    bounds = np.flatnonzero(np.r_[True, edge_labels[order][1:] != edge_labels[order][:-1], True])
+    best = np.full(n_master, -1, dtype=np.int64)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        edges = order[lo:hi]
+        r, c, sc = rows[edges], cols[edges], scores[edges]
+        if hi - lo == 1:
+            best[r[0]] = c[0]
+            continue
+        masters, local_r = np.unique(r, return_inverse=True)
+        raws, local_c = np.unique(c, return_inverse=True)
+        if max(len(masters), len(raws)) > OPTIMAL_MAX_COMPONENT:
+            part = greedy_assignment(r, c, sc, n_master)
+            best[masters] = part[masters]
+            continue
+        weights = np.zeros((len(masters), len(raws)))
+        has_edge = np.zeros(weights.shape, dtype=bool)
+        weights[local_r, local_c] = sc
+        has_edge[local_r, local_c] = True
+        assigned_r, assigned_c = linear_sum_assignment(weights, maximize=True)
+        keep = has_edge[assigned_r, assigned_c]
+        best[masters[assigned_r[keep]]] = raws[assigned_c[keep]]
+    return best
+
+def alias_matches(best, methods, master_emails, raw_names, aliases, one_to_one=False):
+    """
+    Resolves unmatched master rows through stored aliases (normalized raw
+    name -> master email), in raw row order. Updates best/methods in place
+    with the method "alias".
+    """
+    if not aliases:
+        return
+    master_by_email = {}
+    for i, email in enumerate(master_emails):
+        email = _normalize_email(email)
+        if email:
+            master_by_email.setdefault(email, i)
+    used = set(best[best >= 0].tolist()) if one_to_one else set()
+    for j, name in enumerate(raw_names):
+        email = aliases.get(name)
+        if not email:
+            continue
+        i = master_by_email.get(email)
+        if i is not None and best[i] < 0 and j not in used:
+            best[i], methods[i] = j, "alias"
+            used.add(j)
+
+def find_matches(master_names, master_emails, raw_names, raw_emails=None, threshold=MATCH_THRESHOLD,
+                 assignment="best", aliases=None, master_keys=None):
+    """
+    exact_matches first, then stored ``aliases`` (see AliasStore), then
+    fuzzy matching for the master rows still unmatched. Returns (raw index
+    or -1, method) arrays; the method is "email", "exact", "alias",
+    "fuzzy" or "" for unmatched rows.
+
+    ``assignment`` is "best" (each master row takes its best raw row, so
+    two can share one), "greedy" or "optimal" (one-to-one over the
+    thresholded score graph; see greedy_assignment and optimal_assignment).
+    ``master_keys`` are the master names' block_keys, when prebuilt.
+    """
+    if assignment not in ASSIGNMENT_MODES:
+        raise ValueError(f"Unknown assignment mode '{assignment}'. Use one of: {', '.join(ASSIGNMENT_MODES)}.")
+    names = raw_names.names if isinstance(raw_names, NameIndex) else raw_names
+    one_to_one = assignment != "best"
+    best, methods = exact_matches(master_names, master_emails, names, raw_emails, one_to_one)
+    alias_matches(best, methods, master_emails, names, aliases, one_to_one)
+    pending = np.flatnonzero(best < 0)
+    if not len(pending) or not len(names):
+        return best, methods
+    pending_names = [master_names[i] for i in pending]
+    pending_keys = [master_keys[i] for i in pending] if master_keys else None
+    if not one_to_one:
+        best[pending] = best_matches(pending_names, raw_names, threshold, master_keys=pending_keys)
+    else:
+        free = np.setdiff1d(np.arange(len(names)), best[best >= 0])
+        rows, cols, scores = candidate_edges(pending_names, [names[j] for j in free], threshold,
+                                             master_keys=pending_keys)
+        if assignment == "optimal":
+            picked = optimal_assignment(rows, cols, scores, len(pending), len(free))
+        else:
+            picked = greedy_assignment(rows, cols, scores, len(pending))
+        best[pending] = np.where(picked >= 0, free[np.maximum(picked, 0)], -1)
+    methods[pending[best[pending] >= 0]] = "fuzzy"
+    return best, methods
+
+# ====================================================
+# Alias Store
+# ====================================================
+
+ALIAS_DB_NAME = "aliases.sqlite3"
+# Aliases of rosters not matched against for this long are dropped.
+ALIAS_MAX_AGE_DAYS = 180
+# Methods whose pairings are worth remembering: email matches confirm the pairing
+# and replayed aliases stay fresh. Fuzzy matches are not saved, so a bad guess
+# is never replayed ahead of scoring.
+ALIAS_METHODS = ("email", "alias")
+
+def roster_fingerprint(master_emails, master_names):
+    """Hash of a master roster's (email, normalized name) rows, order-independent."""
+    digest = hashlib.sha256()
+    for email, name in sorted(zip((_normalize_email(e) for e in master_emails), master_names)):
+        digest.update(f"{email}\t{name}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+class AliasStore:
+    """
+    Confirmed normalized raw name -> master email pairs, kept in SQLite
+    under ``directory`` and scoped to a roster fingerprint, so any change
+    to the master roster starts from a clean slate.
+    """
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, ALIAS_DB_NAME)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS aliases ("
+                         "roster TEXT NOT NULL, raw_name TEXT NOT NULL, email TEXT NOT NULL, "
+                         "updated REAL NOT NULL, PRIMARY KEY (roster, raw_name))")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, roster):
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT raw_name, email FROM aliases WHERE roster = ?", (roster,)))
+
+    def save(self, roster, pairs):
+        """Upserts (raw name, email) pairs for ``roster`` and drops stale rosters."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO aliases VALUES (?, ?, ?, ?)",
+                             [(roster, raw_name, email, now) for raw_name, email in pairs])
+            conn.execute("DELETE FROM aliases WHERE roster != ? AND updated < ?",
+                         (roster, now - ALIAS_MAX_AGE_DAYS * 86400))
+
+def confirmed_aliases(master_emails, raw_names, best, methods):
+    """(normalized raw name, master email) for matches worth remembering."""
+    pairs = {}
+    for i in np.flatnonzero(best >= 0):
+        email = _normalize_email(master_emails[i])
+        if email and methods[i] in ALIAS_METHODS:
+            pairs.setdefault(raw_names[best[i]], email)
+    return list(pairs.items())
+
+def match_details(mdf, master_names, rdf, raw_names, best, methods):
+    """One row per master row: its matched raw name, how it matched and the name score."""
+    matched = best >= 0
+    raw_display = np.full(len(best), "", dtype=object)
+    raw_display[matched] = rdf["Name"].to_numpy(dtype=object)[best[matched]]
+    scores = [round(fuzz.token_set_ratio(master_names[i], raw_names[best[i]]), 1) if matched[i] else None
+              for i in range(len(best))]
+    return pd.DataFrame({
+        "Email": mdf["Email"].to_numpy(),
+        "Participant Name": mdf["Participant Name"].to_numpy(),
+        "Matched Raw Name": raw_display,
+        "Match Method": np.where(matched, methods, "unmatched"),
+        "Name Score": scores,
+    })
+
+# ====================================================
+# Matching Output
+# ====================================================
+
+def read_master_file(master_file):
+    mdf = pd.read_csv(master_file) if master_file.lower().endswith(".csv") else pd.read_excel(master_file)
+    email_col = next((c for c in mdf.columns if str(c).strip().lower() in ("email", "email_id")), None)
+    name_col = next((c for c in mdf.columns if str(c).strip().lower() in ("participant name", "name")), None)
+    if email_col is None or name_col is None:
+        raise ValueError("Master file must have 'Email' and 'Participant Name' columns.")
+    mdf = mdf[[email_col, name_col]].copy()
+    mdf.columns = ["Email", "Participant Name"]
+    return mdf
+
+class MasterIndex:
+    """
+    A master roster read and indexed once (normalized names, their block
+    keys, the roster fingerprint) so it can be matched against many raw
+    sheets.
+    """
+    def __init__(self, master_file):
+        self.path = master_file
+        self.frame = read_master_file(master_file)
+        self.emails = self.frame["Email"].tolist()
+        self.names = [normalize_name(str(name)) for name in self.frame["Participant Name"]]
+        self.keys = [block_keys(name) for name in self.names]
+        self.fingerprint = roster_fingerprint(self.emails, self.names)
+
+class MatchResult:
+    """One raw sheet matched against a master roster."""
+    def __init__(self, raw_file, session_cols, matched, unmatched, details):
+        self.raw_file = raw_file
+        self.session_cols = session_cols
+        self.matched = matched
+        self.unmatched = unmatched
+        self.details = details
+
+def match_raw_file(master, raw_file, assignment="best", store=None):
+    """Matches one raw sheet against a MasterIndex, consulting and updating ``store`` if given."""
+    rdf = read_raw_file(raw_file)
+    session_cols = raw_session_columns(rdf)
+    raw_norm_names = [normalize_name(n) for n in list(rdf["Name"])]
+    raw_emails = rdf["Email"].tolist() if "Email" in rdf.columns else None
+    best, methods = find_matches(master.names, master.emails, raw_norm_names, raw_emails,
+                                 assignment=assignment, master_keys=master.keys,
+                                 aliases=store.load(master.fingerprint) if store else None)
+    if store:
+        store.save(master.fingerprint, confirmed_aliases(master.emails, raw_norm_names, best, methods))
+    details_df = match_details(master.frame, master.names, rdf, raw_norm_names, best, methods)
+    matched_df, unmatched_df = assemble_matches(master.frame, rdf, session_cols, best)
+    return MatchResult(raw_file, session_cols, matched_df, unmatched_df, details_df)
+
+def _base_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def _empty_summary():
+    return pd.DataFrame([], columns=["email_id", "attendance(absent/present/leave)"])
+
+def write_match_output(master_file, result, out_fmt="xlsx"):
+    """Writes one master/raw result as before: Matched, Unmatched Raw, Summary and Match Details."""
+    out_dir = os.path.dirname(master_file)
+    mbase, rbase = _base_name(master_file), _base_name(result.raw_file)
+    matched_df, unmatched_df, details_df = result.matched, result.unmatched, result.details
+    if out_fmt == "xlsx":
+        out_path = os.path.join(out_dir, f"{mbase}_matched_with_{rbase}_attendance.xlsx")
+        with pd.ExcelWriter(out_path, engine="openpyxl") as w:
+            matched_df.to_excel(w, index=False, sheet_name="Matched")
+            if not unmatched_df.empty:
+                unmatched_df.to_excel(w, index=False, sheet_name="Unmatched Raw")
+            _empty_summary().to_excel(w, index=False, sheet_name="Summary")
+            details_df.to_excel(w, index=False, sheet_name="Match Details")
+        return out_path
+    prefix = os.path.join(out_dir, f"{mbase}_matched_with_{rbase}_")
+    matched_df.to_csv(prefix + "matched.csv", index=False)
+    if not unmatched_df.empty:
+        unmatched_df.to_csv(prefix + "unmatched.csv", index=False)
+    _empty_summary().to_csv(prefix + "summary.csv", index=False)
+    details_df.to_csv(prefix + "match_details.csv", index=False)
+    return prefix + "matched.csv"
+
+def _sheet_name(title, taken):
+    """An Excel-safe sheet name (31 chars, no []:*?/\\) not already in ``taken``."""
+    base = re.sub(r"[\[\]:*?/\\]", "_", title)[:31]
+    name, n = base, 1
+    while name in taken:
+        n += 1
+        suffix = f" ({n})"
+        name = base[:31 - len(suffix)] + suffix
+    taken.add(name)
+    return name
+
+def write_consolidated_output(master, results, out_fmt="xlsx"):
+    """
+    Writes one workbook (or CSV set) for a master matched against several
+    raw sheets: the Matched sheet carries one "<raw file> | <session>"
+    column group per raw file, unmatched rows get a sheet per raw file and
+    Match Details gains a Raw File column.
+    """
+    groups = [master.frame.reset_index(drop=True)]
+    details = []
+    for result in results:
+        rbase = _base_name(result.raw_file)
+        block = result.matched[result.session_cols]
+        block.columns = [f"{rbase} | {col}" for col in result.session_cols]
+        groups.append(block)
+        details.append(result.details.assign(**{"Raw File": rbase}))
+    matched_df = pd.concat(groups, axis=1)
+    details_df = pd.concat(details, ignore_index=True)
+    details_df = details_df[["Raw File"] + [c for c in details_df.columns if c != "Raw File"]]
+    out_dir = os.path.dirname(master.path)
+    mbase = _base_name(master.path)
+    if out_fmt == "xlsx":
+        out_path = os.path.join(out_dir, f"{mbase}_consolidated_attendance.xlsx")
+        taken = {"Matched", "Summary", "Match Details"}
+        with pd.ExcelWriter(out_path, engine="openpyxl") as w:
+            matched_df.to_excel(w, index=False, sheet_name="Matched")
+            for result in results:
+                if not result.unmatched.empty:
+                    sheet = _sheet_name(f"Unmatched {_base_name(result.raw_file)}", taken)
+                    result.unmatched.to_excel(w, index=False, sheet_name=sheet)
+            _empty_summary().to_excel(w, index=False, sheet_name="Summary")
+            details_df.to_excel(w, index=False, sheet_name="Match Details")
+        return out_path
+    prefix = os.path.join(out_dir, f"{mbase}_consolidated_")
+    matched_df.to_csv(prefix + "matched.csv", index=False)
+    for result in results:
+        if not result.unmatched.empty:
+            result.unmatched.to_csv(prefix + f"{_base_name(result.raw_file)}_unmatched.csv", index=False)
+    _empty_summary().to_csv(prefix + "summary.csv", index=False)
+    details_df.to_csv(prefix + "match_details.csv", index=False)
+    return prefix + "matched.csv"
+
+def match_many(master_file, raw_files, out_fmt="xlsx", assignment="best", alias_dir=None, consolidated=False):
+    """
+    Matches one master roster, read and indexed once, against every raw
+    file. Returns the output paths: one per raw file, or a single
+    consolidated output when ``consolidated`` is set.
+    """
+    master = MasterIndex(master_file)
+    store = AliasStore(alias_dir) if alias_dir else None
+    results = [match_raw_file(master, raw_file, assignment, store) for raw_file in raw_files]
+    if consolidated:
+        return [write_consolidated_output(master, results, out_fmt)]
+    return [write_match_output(master_file, result, out_fmt) for result in results]
+
+def match_and_write(master_file: str, raw_file: str, out_fmt: str = "xlsx", assignment: str = "best",
+                    alias_dir: str = None) -> str:
+    return match_many(master_file, [raw_file], out_fmt, assignment, alias_dir)[0]
@@ -1,8 +1,15 @@
 import os
 import csv
+import hashlib
 import math
-from datetime import datetime, timedelta
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook
 
 # ====================================================
 # Helper Functions
@@ -26,183 +33,821 @@ def parse_datetime(dt_str):
     except Exception:
         raise ValueError(f"Invalid datetime format: {dt_str}. Expected format: YYYY-MM-DD HH:MM:SS")
 
-def merge_intervals(intervals):
-    if not intervals:
-        return []
-    intervals.sort(key=lambda x: x[0])
-    merged = [intervals[0]]
-    for current in intervals[1:]:
-        last = merged[-1]
-        if current[0] <= last[1]:
-            merged[-1] = (last[0], max(last[1], current[1]))
+# Timestamp layouts seen in Zoom participant exports, tried in order. Only
+# month-first layouts are listed so ambiguous dates read the same way
+# pd.to_datetime has always read them.
+DATETIME_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %I:%M %p",
+    "%m/%d/%Y %H:%M",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+]
+FORMAT_SAMPLE_SIZE = 50
+_detected_formats = {}
+
+def _value_shape(value):
+    return re.sub(r"\d", "9", value)
+
+def _count_matches(values, fmt):
+    count = 0
+    for value in values:
+        try:
+            datetime.strptime(value, fmt)
+            count += 1
+        except ValueError:
+            pass
+    return count
+
+def detect_datetime_format(values):
+    """
+    Returns the entry of DATETIME_FORMATS that parses the most values (the
+    earliest one on a tie), or None if no format parses any of them.
+    """
+    best_fmt, best_count = None, 0
+    for fmt in DATETIME_FORMATS:
+        count = _count_matches(values, fmt)
+        if count > best_count:
+            best_fmt, best_count = fmt, count
+        if count == len(values):
+            break
+    return best_fmt
+
+_FIELD_WIDTHS = {"Y": 4, "m": 2, "d": 2, "H": 2, "I": 2, "M": 2, "S": 2, "p": 2}
+
+def _parse_fixed_width(values, fmt):
+    """
+    Parses zero-padded timestamps laid out exactly as ``fmt`` by slicing the
+    characters of the whole column at once. Returns datetime64[ns] values and
+    a mask of the rows that matched; other rows are left to the caller.
+    """
+    layout, width = [], 0
+    for token in re.findall(r"%.|[^%]", fmt):
+        layout.append((token, width))
+        width += _FIELD_WIDTHS[token[1]] if token.startswith("%") else 1
+    text = np.asarray(values, dtype=f"U{width + 1}")
+    chars = text.view(np.uint32).reshape(len(text), width + 1).astype(np.int64)
+    ok = chars[:, width] == 0
+    fields = {}
+    for token, position in layout:
+        if token == "%p":
+            meridiem = chars[:, position] | 32
+            ok &= ((meridiem == ord("a")) | (meridiem == ord("p"))) & ((chars[:, position + 1] | 32) == ord("m"))
+            fields["p"] = meridiem == ord("p")
+        elif token.startswith("%"):
+            size = _FIELD_WIDTHS[token[1]]
+            digits = chars[:, position:position + size] - ord("0")
+            ok &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+            fields[token[1]] = digits @ (10 ** np.arange(size - 1, -1, -1))
         else:
-            merged.append(current)
-    return merged
-
-def compute_total_duration(intervals):
-    total = timedelta()
-    for start, end in intervals:
-        total += (end - start)
-    return total.total_seconds() / 60
-
-def intersect_interval(interval, period):
-    start, end = interval
-    p_start, p_end = period
-    new_start = max(start, p_start)
-    new_end = min(end, p_end)
-    return (new_start, new_end) if new_start < new_end else None
-
-def get_global_times(file_path):
-    try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
-    except Exception as e:
-        raise ValueError(f"Error reading file '{file_path}' for global times: {e}")
-    name_col = get_column(df, ["Name", "Name (Original Name)", "Name (original name)"], "name column")
-    join_col = get_column(df, ["Join Time", "Join time"], "Join Time")
-    leave_col = get_column(df, ["Leave Time", "Leave time"], "Leave Time")
-    try:
-        df[join_col] = pd.to_datetime(df[join_col])
-        df[leave_col] = pd.to_datetime(df[leave_col])
-    except Exception as e:
-        raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
-    df["Name_lower"] = df[name_col].str.lower()
-    global_times = {}
-    for name_lower, group in df.groupby("Name_lower"):
-        global_times[name_lower] = (group[join_col].min(), group[leave_col].max())
-    return global_times
-
-def get_total_durations(file_path):
+            ok &= chars[:, position] == ord(token)
+    hour = fields.get("H", fields.get("I"))
+    if "p" in fields:
+        ok &= (hour >= 1) & (hour <= 12)
+        hour = hour % 12 + 12 * fields["p"]
+    seconds = fields.get("S", 0)
+    ok &= (fields["m"] >= 1) & (fields["m"] <= 12) & (fields["d"] >= 1)
+    ok &= (hour <= 23) & (fields["M"] <= 59) & (seconds <= 59)
+    months = ((fields["Y"] - 1970) * 12 + fields["m"] - 1).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + (fields["d"] - 1).astype("timedelta64[D]")
+    ok &= days.astype("datetime64[M]") == months
+    parsed = days.astype("datetime64[ns]") + (hour * 3600 + fields["M"] * 60 + seconds).astype("timedelta64[s]")
+    parsed[~ok] = np.datetime64("NaT")
+    return parsed, ok
+
+def parse_datetime_column(series):
+    """
+    Parses a column of timestamps with an explicit format detected from a
+    sample of its values. The format is cached per (column, value shape)
+    so later chunks and files skip detection. Values that don't fit the
+    format are tried against the other DATETIME_FORMATS (which share its
+    month-before-day order) and ISO 8601; a value none of them parse
+    raises ValueError rather than being guessed at, since a guess could
+    read a day-first date as month-first.
+    """
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return pd.to_datetime(series)
+    sample = [str(value).strip() for value in series.dropna().iloc[:FORMAT_SAMPLE_SIZE]]
+    if not sample:
+        return pd.to_datetime(series)
+    signature = (series.name, _value_shape(sample[0]))
+    fmt = _detected_formats.get(signature)
+    if fmt is None or _count_matches(sample, fmt) < len(sample):
+        fmt = _detected_formats[signature] = detect_datetime_format(sample)
+    if fmt is None:
+        return pd.to_datetime(series)
+    if fmt.startswith("%Y-%m-%d"):
+        # pandas parses ISO 8601 layouts in C, faster than slicing characters.
+        parsed = pd.to_datetime(series, format=fmt, errors="coerce")
+    else:
+        values, ok = _parse_fixed_width(series.to_numpy(dtype=object), fmt)
+        parsed = pd.Series(values, index=series.index, name=series.name)
+        rest = ~ok & series.notna().to_numpy()
+        if rest.any():
+            parsed[rest] = pd.to_datetime(series[rest], format=fmt, errors="coerce")
+    failed = parsed.isna() & series.notna()
+    if failed.any():
+        parsed[failed] = [_parse_unmatched_datetime(str(value).strip(), series.name) for value in series[failed]]
+    return parsed
+
+def _parse_unmatched_datetime(value, column):
+    for fmt in DATETIME_FORMATS:
+        try:
+            return pd.Timestamp(datetime.strptime(value, fmt))
+        except ValueError:
+            pass
     try:
-        df = pd.read_csv(file_path, skiprows=3)
+        parsed = pd.to_datetime(value, format="ISO8601")
+    except (ValueError, TypeError):
+        raise ValueError(f"Unrecognized date/time '{value}' in column '{column}'. "
+                         "Expected format: YYYY-MM-DD HH:MM:SS or MM/DD/YYYY HH:MM:SS")
+    if parsed.tzinfo is not None:
+        raise ValueError(f"Column '{column}' has times with a UTC offset ('{value}'). "
+                         "Remove the offsets so times match the session times.")
+    return parsed
+
+def _naive_ns(parsed):
+    """
+    int64 nanoseconds of parsed timestamps. Session windows are naive local
+    times, so values carrying a UTC offset are rejected rather than being
+    shifted to UTC.
+    """
+    if isinstance(parsed.dtype, pd.DatetimeTZDtype) or (
+            parsed.dtype == object and any(getattr(value, "tzinfo", None) is not None for value in parsed)):
+        raise ValueError(f"Column '{parsed.name}' has times with a UTC offset. "
+                         "Remove the offsets so times match the session times.")
+    return parsed.to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+NS_PER_MINUTE = 60 * 10**9
+NAT = np.datetime64("NaT").astype(np.int64)
+
+def to_ns(value):
+    """Converts a datetime/Timestamp to int64 nanoseconds since the epoch."""
+    return pd.Timestamp(value).value
+
+def _segment_starts(keys):
+    """Returns the indices where a run of equal values in a sorted array begins."""
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+# ====================================================
+# Interval Engine
+# ====================================================
+
+class MergedIntervals:
+    """
+    Non-overlapping attendance intervals for every participant, stored as
+    int64 nanosecond arrays sorted by (participant code, start).
+    """
+    def __init__(self, codes, starts, ends, n_participants):
+        self.codes = codes
+        self.starts = starts
+        self.ends = ends
+        self.n_participants = n_participants
+        self.offsets = _segment_starts(codes)
+        self.segment_codes = codes[self.offsets]
+
+    def session_durations(self, session_start, session_end):
+        """Minutes each participant spent inside [session_start, session_end]."""
+        durations = np.zeros(self.n_participants, dtype=np.float64)
+        if len(self.codes) == 0:
+            return durations
+        p_start, p_end = to_ns(session_start), to_ns(session_end)
+        clipped = np.clip(self.ends, p_start, p_end) - np.clip(self.starts, p_start, p_end)
+        np.maximum(clipped, 0, out=clipped)
+        totals = np.add.reduceat(clipped, self.offsets)
+        durations[self.segment_codes] = totals / NS_PER_MINUTE
+        return durations
+
+    def covered_before(self, times):
+        """
+        Covered time (ns) of every participant before each of the sorted
+        ``times``, as a participants x times matrix. Each time is located
+        inside a participant's intervals by bisection and the coverage is
+        read off a per-participant prefix sum of interval lengths.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        covered = np.zeros((self.n_participants, len(times)), dtype=np.int64)
+        if len(self.codes) == 0 or len(times) == 0:
+            return covered
+        lengths = np.maximum(self.ends - self.starts, 0)
+        cumulative = np.cumsum(lengths)
+        segment_ids = np.cumsum(np.r_[False, self.codes[1:] != self.codes[:-1]])
+        segment_base = (cumulative - lengths)[self.offsets]
+        before = cumulative - lengths - segment_base[segment_ids]
+        # Rank starts and query times together so (segment, time) pairs can be
+        # packed into one globally sorted int64 key for a single searchsorted.
+        values = np.unique(np.concatenate([self.starts, times]))
+        stride = np.int64(len(values) + 1)
+        start_keys = segment_ids * stride + np.searchsorted(values, self.starts)
+        query_keys = (np.arange(len(self.offsets), dtype=np.int64)[:, None] * stride
+                      + np.searchsorted(values, times)[None, :])
+        last = np.searchsorted(start_keys, query_keys, side="right") - 1
+        inside = last >= self.offsets[:, None]
+        last = np.where(inside, last, 0)
+        partial = np.clip(times[None, :] - self.starts[last], 0, lengths[last])
+        covered[self.segment_codes] = np.where(inside, before[last] + partial, 0)
+        return covered
+
+    def duration_matrix(self, windows):
+        """
+        Minutes every participant spent inside each (start, end) window, as a
+        participants x windows matrix computed in one sweep over the boundaries.
+        """
+        bounds = np.array([[to_ns(start), to_ns(end)] for start, end in windows], dtype=np.int64).reshape(-1, 2)
+        times, positions = np.unique(bounds, return_inverse=True)
+        positions = positions.reshape(-1, 2)
+        covered = self.covered_before(times)
+        spent = covered[:, positions[:, 1]] - covered[:, positions[:, 0]]
+        return np.maximum(spent, 0) / NS_PER_MINUTE
+
+def merge_intervals(codes, starts, ends, n_participants):
+    """
+    Merges overlapping (start, end) intervals per participant code. Intervals
+    that touch or overlap collapse into one, matching the old per-participant
+    merge. Rows with a missing join or leave time are ignored.
+    """
+    valid = (codes >= 0) & (starts != NAT) & (ends != NAT)
+    codes, starts, ends = codes[valid], starts[valid], ends[valid]
+    order = np.lexsort((starts, codes))
+    codes, starts, ends = codes[order], starts[order], ends[order]
+    if len(codes) == 0:
+        return MergedIntervals(codes, starts, ends, n_participants)
+    # Rank the timestamps so that a per-participant offset can be added without
+    # overflowing int64; a plain cumulative max then never leaks across codes.
+    values, ranks = np.unique(np.concatenate([starts, ends]), return_inverse=True)
+    start_ranks, end_ranks = ranks[:len(starts)], ranks[len(starts):]
+    stride = np.int64(len(values) + 1)
+    running_end = np.maximum.accumulate(codes * stride + end_ranks) - codes * stride
+    new_segment = np.r_[True, codes[1:] != codes[:-1]]
+    new_interval = new_segment.copy()
+    new_interval[1:] |= start_ranks[1:] > running_end[:-1]
+    group_starts = np.flatnonzero(new_interval)
+    return MergedIntervals(codes[group_starts], starts[group_starts],
+                           np.maximum.reduceat(ends, group_starts), n_participants)
+
+NAME_COLUMNS = ["Name", "Name (Original Name)", "Name (original name)"]
+EMAIL_COLUMNS = ["Email", "User Email"]
+JOIN_COLUMNS = ["Join Time", "Join time"]
+LEAVE_COLUMNS = ["Leave Time", "Leave time"]
+DURATION_COLUMNS = ["Duration", "Duration (minutes)"]
+
+# Rows per chunk when a log is streamed, and the file size above which
+# load_zoom_log switches to streaming on its own.
+CHUNK_SIZE = 50000
+STREAM_ABOVE_BYTES = 64 * 1024 * 1024
+
+class ParsedLog:
+    """
+    A Zoom participant log reduced to what every stage of
+    process_sessions_for_file needs, built once per file. Participants are
+    identified by their lowercased name and indexed by position in the
+    sorted ``keys`` array; ``names``/``emails`` come from each participant's
+    first row, and ``merged`` holds their merged join/leave intervals.
+    """
+    def __init__(self, keys, names, emails, global_join, global_leave, total_durations, merged, file_path=None):
+        self.file_path = file_path
+        self.content_hash = None
+        self.keys = keys
+        self.names = names
+        self.emails = emails
+        self.global_join = global_join
+        self.global_leave = global_leave
+        self.total_durations = total_durations
+        self.merged = merged
+
+    @property
+    def n_participants(self):
+        return len(self.keys)
+
+class _LogAccumulator:
+    """
+    Folds a Zoom log into per-participant state one chunk at a time. Only
+    the merged intervals and per-participant aggregates are kept between
+    chunks, so memory is bounded by the chunk size and not the file size.
+    """
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.columns = None
+        self.key_codes = {}
+        self.names = []
+        self.emails = []
+        self.first_join = np.zeros(0, dtype=np.int64)
+        self.last_leave = np.zeros(0, dtype=np.int64)
+        self.durations = np.zeros(0, dtype=np.float64)
+        empty = np.zeros(0, dtype=np.int64)
+        self.merged = MergedIntervals(empty, empty, empty, 0)
+
+    def _resolve_columns(self, df):
+        self.columns = (
+            get_column(df, NAME_COLUMNS, "name column"),
+            get_column(df, EMAIL_COLUMNS, "Email"),
+            get_column(df, JOIN_COLUMNS, "Join Time"),
+            get_column(df, LEAVE_COLUMNS, "Leave Time"),
+            get_column(df, DURATION_COLUMNS, "duration column"),
+        )
+
+    def add_chunk(self, df):
         df.columns = df.columns.str.strip()
-        name_col = get_column(df, ["Name", "Name (Original Name)", "Name (original name)"], "name column")
-        duration_col = get_column(df, ["Duration", "Duration (minutes)"], "duration column")
-        df[duration_col] = pd.to_numeric(df[duration_col], errors="coerce")
-        df["Name_lower"] = df[name_col].str.lower()
-        return df.groupby("Name_lower")[duration_col].sum().to_dict()
-    except Exception as e:
-        raise ValueError(f"Error computing total durations from '{file_path}': {e}")
+        if self.columns is None:
+            self._resolve_columns(df)
+        name_col, email_col, join_col, leave_col, duration_col = self.columns
+        try:
+            join = _naive_ns(parse_datetime_column(df[join_col]))
+            leave = _naive_ns(parse_datetime_column(df[leave_col]))
+        except Exception as e:
+            raise ValueError(f"Error converting join/leave times in '{self.file_path}': {e}")
+        durations = pd.to_numeric(df[duration_col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        names_lower = df[name_col].astype(object).str.lower().to_numpy()
+        inverse, uniques = pd.factorize(names_lower)
+        seen, first_rows = np.unique(inverse, return_index=True)
+        first_rows = first_rows[seen >= 0]
+        chunk_codes = np.array([self.key_codes.get(key, -1) for key in uniques], dtype=np.int64)
+        new = np.flatnonzero(chunk_codes < 0)
+        if len(new):
+            chunk_codes[new] = np.arange(len(self.key_codes), len(self.key_codes) + len(new))
+            self.key_codes.update(zip(uniques[new], chunk_codes[new].tolist()))
+            self.names.extend(df[name_col].to_numpy()[first_rows[new]])
+            self.emails.extend(df[email_col].to_numpy()[first_rows[new]])
+        n_participants = len(self.key_codes)
+        grow = n_participants - len(self.durations)
+        if grow:
+            self.first_join = np.r_[self.first_join, np.full(grow, np.iinfo(np.int64).max)]
+            self.last_leave = np.r_[self.last_leave, np.full(grow, NAT)]
+            self.durations = np.r_[self.durations, np.zeros(grow)]
+        named = inverse >= 0
+        codes = np.full(len(inverse), -1, dtype=np.int64)
+        codes[named] = chunk_codes[inverse[named]]
+        has_join = named & (join != NAT)
+        np.minimum.at(self.first_join, codes[has_join], join[has_join])
+        np.maximum.at(self.last_leave, codes[named], leave[named])
+        self.durations += np.bincount(codes[named], weights=np.nan_to_num(durations[named]),
+                                      minlength=n_participants)
+        previous = self.merged
+        self.merged = merge_intervals(np.r_[previous.codes, codes], np.r_[previous.starts, join],
+                                      np.r_[previous.ends, leave], n_participants)
+
+    def finish(self):
+        if self.columns is None:
+            raise ValueError(f"Error reading file '{self.file_path}': No columns to parse from file")
+        keys = np.empty(len(self.key_codes), dtype=object)
+        keys[:] = list(self.key_codes)
+        # Codes were handed out in order of first appearance; renumber them so
+        # participants come out sorted by lowercased name.
+        order = np.argsort(keys, kind="stable")
+        renumber = np.empty_like(order)
+        renumber[order] = np.arange(len(order))
+        first_join = np.where(self.first_join == np.iinfo(np.int64).max, NAT, self.first_join)
+        merged = self.merged
+        return ParsedLog(
+            keys[order],
+            np.asarray(self.names, dtype=object)[order],
+            np.asarray(self.emails, dtype=object)[order],
+            first_join[order].astype("datetime64[ns]"),
+            self.last_leave[order].astype("datetime64[ns]"),
+            self.durations[order],
+            merge_intervals(renumber[merged.codes], merged.starts, merged.ends, len(order)),
+            self.file_path,
+        )
 
-def process_csv_session(file_path, session_start, session_end, time_required):
+def _read_log_chunks(file_path, chunk_size):
     try:
-        df = pd.read_csv(file_path, skiprows=3)
-        df.columns = df.columns.str.strip()
+        if not chunk_size:
+            yield pd.read_csv(file_path, skiprows=3)
+            return
+        for chunk in pd.read_csv(file_path, skiprows=3, chunksize=chunk_size):
+            yield chunk
     except Exception as e:
         raise ValueError(f"Error reading file '{file_path}': {e}")
-    name_col = get_column(df, ["Name", "Name (Original Name)", "Name (original name)"], "name column")
-    email_col = get_column(df, ["Email", "User Email"], "Email")
-    join_col = get_column(df, ["Join Time", "Join time"], "Join Time")
-    leave_col = get_column(df, ["Leave Time", "Leave time"], "Leave Time")
-    try:
-        df[join_col] = pd.to_datetime(df[join_col])
-        df[leave_col] = pd.to_datetime(df[leave_col])
-    except Exception as e:
-        raise ValueError(f"Error converting join/leave times in '{file_path}': {e}")
-    df["Name_lower"] = df[name_col].str.lower()
+
+def load_zoom_log(file_path, chunk_size=None):
+    """
+    Reads a Zoom participant log into a ParsedLog. With ``chunk_size`` set
+    (or for files above STREAM_ABOVE_BYTES) the CSV is streamed in chunks of
+    that many rows; the result is identical to the in-memory read.
+    """
+    if chunk_size is None and os.path.isfile(file_path) and os.path.getsize(file_path) > STREAM_ABOVE_BYTES:
+        chunk_size = CHUNK_SIZE
+    accumulator = _LogAccumulator(file_path)
+    for chunk in _read_log_chunks(file_path, chunk_size):
+        accumulator.add_chunk(chunk)
+    return accumulator.finish()
+
+def _as_parsed_log(source):
+    return source if isinstance(source, ParsedLog) else load_zoom_log(source)
+
+def get_global_times(source):
+    log = _as_parsed_log(source)
+    joins = pd.DatetimeIndex(log.global_join)
+    leaves = pd.DatetimeIndex(log.global_leave)
+    return {name_lower: (joins[code], leaves[code]) for code, name_lower in enumerate(log.keys)}
+
+def get_total_durations(source):
+    log = _as_parsed_log(source)
+    return dict(zip(log.keys, log.total_durations))
+
+def process_csv_session(source, session_start, session_end, time_required):
+    log = _as_parsed_log(source)
+    durations = log.merged.session_durations(session_start, session_end)
+    present = durations >= time_required
+    shortfalls = np.where(present, 0, np.round(time_required - durations, 2))
     session_results = {}
-    for name_lower, group in df.groupby("Name_lower"):
-        original_name = group.iloc[0][name_col]
-        email = group.iloc[0][email_col]
-        intervals = [(row[join_col], row[leave_col]) for _, row in group.iterrows()]
-        merged = merge_intervals(intervals)
-        session_intervals = [intersect_interval(interval, (session_start, session_end))
-                             for interval in merged if intersect_interval(interval, (session_start, session_end))]
-        session_intervals = merge_intervals(session_intervals)
-        session_duration = compute_total_duration(session_intervals)
-        if session_duration >= time_required:
-            status = "P"
-            shortfall = 0
-        else:
-            status = "A"
-            shortfall = round(time_required - session_duration, 2)
+    for code, name_lower in enumerate(log.keys):
         session_results[name_lower] = {
-            "Name": original_name,
-            "Email": email,
-            "session_duration": session_duration,
-            "status": status,
-            "shortfall": shortfall
+            "Name": log.names[code],
+            "Email": log.emails[code],
+            "session_duration": durations[code],
+            "status": "P" if present[code] else "A",
+            "shortfall": shortfalls[code]
         }
     return session_results
 
-def process_sessions_for_file(file_path, sessions_info):
-    global_participants = {}
-    total_sessions = len(sessions_info)
-    session_labels = []
-    for session_index, session in enumerate(sessions_info, start=1):
+# ====================================================
+# Parsed Log Cache
+# ====================================================
+
+# Bump when the parse or the cached layout changes so stale entries are ignored.
+CACHE_VERSION = 1
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# In-process memos on top of the disk cache: recently used logs and their
+# per-session duration columns, so a resubmit with tweaked sessions only
+# evaluates the windows that changed.
+RECENT_LOGS_SIZE = 4
+SESSION_MEMO_SIZE = 512
+# Duration columns are also saved beside each cached log, since batch worker
+# processes (and the in-process memo with them) exit after every batch.
+SESSION_CACHE_COLUMNS = 256
+_recent_logs = OrderedDict()
+_session_durations = OrderedDict()
+_memo_lock = threading.Lock()
+
+def file_digest(file_path, block_size=1024 * 1024):
+    """SHA-256 of the file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def save_parsed_log(log, path):
+    emails_missing = pd.isna(log.emails)
+    np.savez(
+        path,
+        keys=log.keys.astype(str),
+        names=log.names.astype(str),
+        emails=np.where(emails_missing, "", log.emails).astype(str),
+        emails_missing=emails_missing,
+        global_join=log.global_join,
+        global_leave=log.global_leave,
+        total_durations=log.total_durations,
+        codes=log.merged.codes,
+        starts=log.merged.starts,
+        ends=log.merged.ends,
+    )
+
+def load_parsed_log(path, file_path=None):
+    with np.load(path, allow_pickle=False) as data:
+        keys = data["keys"].astype(object)
+        emails = data["emails"].astype(object)
+        emails[data["emails_missing"]] = np.nan
+        merged = MergedIntervals(data["codes"], data["starts"], data["ends"], len(keys))
+        return ParsedLog(keys, data["names"].astype(object), emails, data["global_join"],
+                         data["global_leave"], data["total_durations"], merged, file_path)
+
+def _evict_cache(cache_dir, max_bytes):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".npz"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+def cached_load_zoom_log(file_path, cache_dir, chunk_size=None, max_bytes=CACHE_MAX_BYTES):
+    """
+    load_zoom_log backed by an on-disk cache keyed by the file's content
+    hash, so re-processing the same upload skips parsing entirely. Entries
+    are .npz files under ``cache_dir``; the least recently used are evicted
+    once the directory grows past ``max_bytes``.
+    """
+    try:
+        content_hash = file_digest(file_path)
+    except OSError as e:
+        raise ValueError(f"Error reading file '{file_path}': {e}")
+    with _memo_lock:
+        log = _recent_logs.get(content_hash)
+        if log is not None:
+            _recent_logs.move_to_end(content_hash)
+            return log
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{content_hash}-v{CACHE_VERSION}.npz")
+    if os.path.exists(cache_path):
+        try:
+            log = load_parsed_log(cache_path, file_path)
+            os.utime(cache_path)
+        except Exception:
+            log = None
+    if log is None:
+        log = load_zoom_log(file_path, chunk_size)
+        fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                save_parsed_log(log, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        _evict_cache(cache_dir, max_bytes)
+    log.content_hash = content_hash
+    _remember(_recent_logs, content_hash, log, RECENT_LOGS_SIZE)
+    return log
+
+def _remember(memo, key, value, max_entries):
+    with _memo_lock:
+        memo[key] = value
+        memo.move_to_end(key)
+        while len(memo) > max_entries:
+            memo.popitem(last=False)
+
+def _session_cache_path(cache_dir, content_hash):
+    return os.path.join(cache_dir, f"{content_hash}-v{CACHE_VERSION}-sessions.npz")
+
+def _session_column_name(key):
+    return f"w{key[1]}_{key[2]}"
+
+def load_session_columns(cache_dir, content_hash):
+    """Saved duration columns for a log, by array name; empty if none are readable."""
+    path = _session_cache_path(cache_dir, content_hash)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files}
+        os.utime(path)
+        return columns
+    except Exception:
+        return {}
+
+def save_session_columns(cache_dir, content_hash, columns):
+    """Writes ``columns`` (array name -> durations) atomically beside the cached log."""
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=cache_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, _session_cache_path(cache_dir, content_hash))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def session_duration_matrix(log, windows, cache_dir=None):
+    """
+    log.merged.duration_matrix with per-session memoization. Columns are
+    cached by (content hash, window start, window end), so when a resubmit
+    changes one session only that window is re-evaluated, and a change of
+    threshold alone re-uses every cached column. With ``cache_dir`` the
+    columns are also saved beside the cached log, so they survive the
+    worker process. Logs without a content hash (not loaded through the
+    cache) are evaluated directly.
+    """
+    if log.content_hash is None:
+        return log.merged.duration_matrix(windows)
+    keys = [(log.content_hash, to_ns(start), to_ns(end)) for start, end in windows]
+    with _memo_lock:
+        columns = {key: _session_durations[key] for key in keys if key in _session_durations}
+        for key in columns:
+            _session_durations.move_to_end(key)
+    saved = {}
+    if cache_dir and len(columns) < len(set(keys)):
+        saved = load_session_columns(cache_dir, log.content_hash)
+        for key in keys:
+            column = saved.get(_session_column_name(key))
+            if key not in columns and column is not None and len(column) == log.n_participants:
+                column.setflags(write=False)
+                columns[key] = column
+                _remember(_session_durations, key, column, SESSION_MEMO_SIZE)
+    missing = {}
+    for i, key in enumerate(keys):
+        if key not in columns:
+            missing.setdefault(key, windows[i])
+    if missing:
+        computed = log.merged.duration_matrix(list(missing.values()))
+        for position, key in enumerate(missing):
+            column = computed[:, position].copy()
+            column.setflags(write=False)
+            columns[key] = column
+            _remember(_session_durations, key, column, SESSION_MEMO_SIZE)
+        if cache_dir:
+            # The columns just used go first so the cap drops older windows
+            current = {_session_column_name(key): columns[key] for key in keys}
+            older = [item for item in saved.items() if item[0] not in current]
+            kept = list(current.items()) + older
+            save_session_columns(cache_dir, log.content_hash, dict(kept[:SESSION_CACHE_COLUMNS]))
+    if not keys:
+        return np.zeros((log.n_participants, 0))
+    return np.column_stack([columns[key] for key in keys])
+
+# ====================================================
+# Session Config
+# ====================================================
+
+SESSION_CONFIG_COLUMNS = ["Session Start", "Session End", "Time Required"]
+
+def read_session_config(file_path):
+    """
+    Reads a session config CSV with "Session Start", "Session End" and
+    "Time Required" columns and an optional "File" column naming the log
+    each session belongs to. Returns one sessions_info dict per valid row,
+    with "file" set to the File value or None. Rows that fail to parse are
+    skipped.
+    """
+    try:
+        df = pd.read_csv(file_path)
+    except Exception as e:
+        raise ValueError(f"Error reading session config '{file_path}': {e}")
+    df.columns = df.columns.str.strip()
+    for col in SESSION_CONFIG_COLUMNS:
+        if col not in df.columns:
+            raise ValueError(f"Session Config CSV must contain column '{col}'.")
+    has_file = "File" in df.columns
+    sessions = []
+    for _, row in df.iterrows():
         try:
-            session_results = process_csv_session(file_path, session["session_start"], session["session_end"], session["time_required"])
-            session_global_times = get_global_times(file_path)
-        except ValueError as ve:
-            raise ValueError(str(ve))
-        for name_lower, details in session_results.items():
-            if name_lower not in session_global_times:
-                continue
-            g_join, g_leave = session_global_times[name_lower]
-            session_detail = {
-                "status": details["status"],
-                "shortfall": details["shortfall"],
-                "session_duration": details["session_duration"]
+            session = {
+                "session_start": parse_datetime(row["Session Start"]),
+                "session_end": parse_datetime(row["Session End"]),
+                "time_required": float(row["Time Required"]),
             }
-            if name_lower not in global_participants:
-                global_participants[name_lower] = {
-                    "Name": details["Name"],
-                    "Email": details["Email"],
-                    "global_join": g_join,
-                    "global_leave": g_leave,
-                    "total_duration": details["session_duration"],
-                    "sessions": {session_index: session_detail}
-                }
-            else:
-                curr = global_participants[name_lower]
-                curr["global_join"] = min(curr["global_join"], g_join)
-                curr["global_leave"] = max(curr["global_leave"], g_leave)
-                curr["total_duration"] += details["session_duration"]
-                curr["sessions"][session_index] = session_detail
-        session_labels.append(f"Session {session_index} ({session['session_start'].strftime('%Y-%m-%d %H:%M:%S')})")
-    for participant in global_participants.values():
-        for i in range(1, total_sessions + 1):
-            if i not in participant["sessions"]:
-                req = sessions_info[i-1]["time_required"]
-                participant["sessions"][i] = {"status": "A", "shortfall": req, "session_duration": 0}
+        except Exception:
+            continue
+        file_val = row["File"] if has_file else None
+        session["file"] = str(file_val).strip() if isinstance(file_val, str) and file_val.strip() else None
+        sessions.append(session)
+    return sessions
+
+# ====================================================
+# Attendance Output
+# ====================================================
+
+def _format_times(minutes_values):
+    """format_time over an array: whole minutes and rounded leftover seconds."""
+    minutes = np.floor(minutes_values)
+    seconds = np.round((minutes_values - minutes) * 60)
+    return [f"{int(m)} minutes {int(sec)} seconds" for m, sec in zip(minutes, seconds)]
+
+def _format_timestamps(values):
+    if len(values) == 0:
+        # np.char.replace can't size its output from an empty array
+        return np.array([], dtype=str)
+    text = np.char.replace(np.datetime_as_string(values, unit="s"), "T", " ")
+    return np.where(np.isnat(values), "", text)
+
+class AttendanceTable:
+    """
+    Attendance for one log as column arrays: one row per participant (in
+    ParsedLog order) and one column per session. Statuses and counts are
+    vectorized; shortfall reason strings are only built when a caller asks
+    for them.
+    """
+    def __init__(self, log, sessions_info, durations):
+        self.log = log
+        self.sessions_info = sessions_info
+        self.labels = [f"Session {i} ({session['session_start'].strftime('%Y-%m-%d %H:%M:%S')})"
+                       for i, session in enumerate(sessions_info, start=1)]
+        self.required = np.array([session["time_required"] for session in sessions_info], dtype=np.float64)
+        self.durations = durations
+        self.present = durations >= self.required
+
+    @property
+    def columns(self):
+        return ["Name", "Email", "Join Time", "Leave Time"] + self.labels + ["Total Duration", "Shortfall Reason"]
+
+    def summary(self):
+        present_counts = self.present.sum(axis=0)
+        absent_counts = len(self.present) - present_counts
+        return [f"Session {i}: Present: {p}, Absent: {a}"
+                for i, (p, a) in enumerate(zip(present_counts, absent_counts), start=1)]
+
+    def shortfall_reasons(self):
+        reasons = [[] for _ in range(len(self.present))]
+        required_text = _format_times(self.required)
+        absent_rows, absent_sessions = np.nonzero(~self.present)
+        computed_text = _format_times(self.durations[absent_rows, absent_sessions])
+        for row, session, computed in zip(absent_rows, absent_sessions, computed_text):
+            reasons[row].append(f"User duration is just {computed} out of {required_text[session]} minutes, "
+                                f"which is why marking absent in {self.labels[session]}")
+        return ["; ".join(messages) for messages in reasons]
+
+    def iter_rows(self, include_reasons=True):
+        """Yields one list per participant, in ``columns`` order."""
+        statuses = np.where(self.present, "P", "A").tolist()
+        join_text = _format_timestamps(self.log.global_join).tolist()
+        leave_text = _format_timestamps(self.log.global_leave).tolist()
+        totals = [round(total, 2) for total in self.log.total_durations.tolist()]
+        reasons = self.shortfall_reasons() if include_reasons else [""] * len(statuses)
+        for code in range(len(statuses)):
+            yield ([self.log.names[code], self.log.emails[code], join_text[code], leave_text[code]]
+                   + statuses[code] + [totals[code], reasons[code]])
+
+    def records(self, include_reasons=True):
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.iter_rows(include_reasons)]
+
+def compute_attendance(file_path, sessions_info, chunk_size=None, cache_dir=None):
+    if cache_dir:
+        log = cached_load_zoom_log(file_path, cache_dir, chunk_size)
+    else:
+        log = load_zoom_log(file_path, chunk_size)
+    durations = session_duration_matrix(
+        log, [(session["session_start"], session["session_end"]) for session in sessions_info], cache_dir)
+    return AttendanceTable(log, sessions_info, durations)
+
+def process_sessions_for_file(file_path, sessions_info, chunk_size=None, cache_dir=None):
+    table = compute_attendance(file_path, sessions_info, chunk_size, cache_dir)
+    return table.records(), table.labels, table.summary()
+
+def _excel_value(value):
+    """Maps blanks and NaN to an empty cell, as DataFrame.to_excel does."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _stream_rows(sheet, rows):
+    for row in rows:
+        sheet.append([_excel_value(value) for value in row])
+
+def write_excel(raw_log, output_records, output_file):
+    """
+    Writes the raw log dump ("Sheet1") and the attendance table
+    ("Attendance") with openpyxl's write-only mode, so rows are streamed
+    to disk instead of being held as cell objects. ``raw_log`` may be a
+    DataFrame or any iterable of rows; ``output_records`` may be a list of
+    record dicts or an AttendanceTable.
+    """
     try:
-        raw_durations = get_total_durations(file_path)
+        workbook = Workbook(write_only=True)
+        raw_sheet = workbook.create_sheet("Sheet1")
+        if isinstance(raw_log, pd.DataFrame):
+            raw_log = raw_log.itertuples(index=False, name=None)
+        _stream_rows(raw_sheet, raw_log)
+        attendance_sheet = workbook.create_sheet("Attendance")
+        if isinstance(output_records, AttendanceTable):
+            if output_records.log.n_participants:
+                attendance_sheet.append(output_records.columns)
+                _stream_rows(attendance_sheet, output_records.iter_rows())
+        elif output_records:
+            columns = list(output_records[0])
+            attendance_sheet.append(columns)
+            _stream_rows(attendance_sheet, ([record.get(col) for col in columns] for record in output_records))
+        workbook.save(output_file)
     except Exception as e:
-        raise ValueError(str(e))
-    for name_lower, participant in global_participants.items():
-        if name_lower in raw_durations:
-            participant["total_duration"] = raw_durations[name_lower]
-    output_records = []
-    for participant in global_participants.values():
-        record = {
-            "Name": participant["Name"],
-            "Email": participant["Email"],
-            "Join Time": participant["global_join"].strftime('%Y-%m-%d %H:%M:%S'),
-            "Leave Time": participant["global_leave"].strftime('%Y-%m-%d %H:%M:%S')
-        }
-        for i in range(1, total_sessions + 1):
-            record[session_labels[i-1]] = participant["sessions"][i]["status"]
-        record["Total Duration"] = round(participant["total_duration"], 2)
-        breakdown_msgs = []
-        for i in range(1, total_sessions + 1):
-            sess = participant["sessions"][i]
-            if sess["status"] == "A":
-                req = sessions_info[i-1]["time_required"]
-                computed = sess["session_duration"]
-                breakdown_msgs.append(f"User duration is just {format_time(computed)} out of {format_time(req)} minutes, which is why marking absent in {session_labels[i-1]}")
-        record["Shortfall Reason"] = "; ".join(breakdown_msgs) if breakdown_msgs else ""
-        output_records.append(record)
-    session_summary = []
-    for i in range(1, total_sessions + 1):
-        present_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, {}).get("status", "A") == "P")
-        absent_count = sum(1 for p in global_participants.values() if p["sessions"].get(i, {}).get("status", "A") == "A")
-        session_summary.append(f"Session {i}: Present: {present_count}, Absent: {absent_count}")
-    return output_records, session_labels, session_summary
-
-def write_excel(raw_log_df, output_records, output_file):
+        raise ValueError(f"Error saving output Excel file: {e}")
+
+def _raw_log_rows(f, dialect):
+    with f:
+        yield from csv.reader(f, dialect)
+
+def iter_raw_log(file_path):
+    """
+    Yields the rows of the original log, preamble included, for the raw
+    "Sheet1" dump. Rows are read lazily so write_excel can stream them
+    straight into the sheet without holding the file in memory.
+    """
     try:
-        with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-            raw_log_df.to_excel(writer, sheet_name="Sheet1", index=False, header=False)
-            pd.DataFrame(output_records).to_excel(writer, sheet_name="Attendance", index=False)
+        f = open(file_path, 'r', encoding='utf-8')
     except Exception as e:
-        raise ValueError(f"Error saving output Excel file: {e}")
\ No newline at end of file
+        raise ValueError(f"Error reading raw log from '{file_path}': {e}")
+    try:
+        dialect = csv.Sniffer().sniff(f.read(1024))
+    except csv.Error:
+        # pandas already read the log as a comma-separated file
+        dialect = csv.excel
+    except Exception as e:
+        f.close()
+        raise ValueError(f"Error reading raw log from '{file_path}': {e}")
+    f.seek(0)
+    return _raw_log_rows(f, dialect)
+
+def process_attendance_file(file_path, sessions_info, output_file, cache_dir=None):
+    """
+    Computes attendance for one Zoom log and writes its Excel report.
+    Returns the per-session summary lines. Self-contained so batches can
+    run it in worker processes.
+    """
+    table = compute_attendance(file_path, sessions_info, cache_dir=cache_dir)
+    write_excel(iter_raw_log(file_path), table, output_file)
+    return table.summary()
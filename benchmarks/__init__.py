@@ -0,0 +1,7 @@
+"""
+Benchmarks for the attendance engine and roster matching.
+
+Run from the repository root:
+
+    python -m benchmarks.run --sizes 1000 10000 --output bench.json
+"""
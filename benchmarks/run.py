@@ -0,0 +1,140 @@
+"""
+Times the attendance pipeline on synthetic inputs.
+
+Each scenario generates a Zoom log (and rosters) for a number of
+participants, then times the stages separately: parsing the log, merging
+intervals, evaluating sessions, writing the Excel output and fuzzy
+matching a raw sheet against a master roster. Results are written as JSON
+so runs can be compared across commits.
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import attendance_processing as ap
+from attendance_matching import match_and_write
+from benchmarks import synthetic
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_SESSIONS = 10
+# Matching runs at every size by default. Above attendance_matching.BLOCKING_MIN_RAW
+# raw names it only scores candidates that share a name token, but 100k rosters
+# still take minutes; --max-match-size skips matching above a given size.
+DEFAULT_MAX_MATCH_SIZE = None
+
+def timed(func, repeat=1):
+    """Runs func ``repeat`` times; returns (best seconds, last result)."""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def interval_arrays(log_path):
+    """
+    Participant codes and join/leave nanoseconds, as load_zoom_log builds them:
+    lowercased names without stripping, and rows with no name coded -1 so
+    merge_intervals drops them.
+    """
+    df = pd.read_csv(log_path, skiprows=3)
+    df.columns = df.columns.str.strip()
+    names = df[ap.get_column(df, ap.NAME_COLUMNS, "Name")].astype(object).str.lower()
+    codes, uniques = pd.factorize(names.to_numpy())
+    starts = ap._naive_ns(ap.parse_datetime_column(df[ap.get_column(df, ap.JOIN_COLUMNS, "Join Time")]))
+    ends = ap._naive_ns(ap.parse_datetime_column(df[ap.get_column(df, ap.LEAVE_COLUMNS, "Leave Time")]))
+    return codes.astype(np.int64), starts, ends, len(uniques)
+
+def run_scenario(participants, work_dir, sessions=DEFAULT_SESSIONS, repeat=1,
+                 time_format=synthetic.ISO_FORMAT, max_match_size=DEFAULT_MAX_MATCH_SIZE, seed=0):
+    log_path = os.path.join(work_dir, f"zoom_{participants}.csv")
+    rows = synthetic.write_zoom_log(log_path, participants, time_format=time_format, seed=seed)
+    sessions_info = synthetic.session_windows(sessions)
+    windows = [(s["session_start"], s["session_end"]) for s in sessions_info]
+    base = {"participants": participants, "rows": rows, "sessions": sessions,
+            "bytes": os.path.getsize(log_path)}
+    results = []
+
+    def record(stage, seconds, **extra):
+        results.append(dict(base, stage=stage, seconds=None if seconds is None else round(seconds, 6), **extra))
+
+    seconds, log = timed(lambda: ap.load_zoom_log(log_path), repeat)
+    record("parse", seconds)
+    seconds, _ = timed(lambda: ap.load_zoom_log(log_path, chunk_size=ap.CHUNK_SIZE), repeat)
+    record("parse_chunked", seconds)
+
+    codes, starts, ends, n = interval_arrays(log_path)
+    seconds, _ = timed(lambda: ap.merge_intervals(codes, starts, ends, n), repeat)
+    record("merge", seconds)
+
+    seconds, durations = timed(lambda: log.merged.duration_matrix(windows), repeat)
+    record("sessions", seconds)
+
+    excel_path = os.path.join(work_dir, f"attendance_{participants}.xlsx")
+    seconds, _ = timed(lambda: ap.write_excel(ap.iter_raw_log(log_path),
+                                              ap.AttendanceTable(log, sessions_info, durations),
+                                              excel_path), repeat)
+    record("excel", seconds)
+
+    if max_match_size is None or participants <= max_match_size:
+        master_path = os.path.join(work_dir, f"master_{participants}.csv")
+        raw_path = os.path.join(work_dir, f"raw_{participants}.csv")
+        raw_rows = synthetic.write_rosters(master_path, raw_path, participants, seed=seed)
+        seconds, _ = timed(lambda: match_and_write(master_path, raw_path, "csv"), repeat)
+        record("match", seconds, raw_rows=raw_rows)
+    else:
+        record("match", None, skipped=f"above --max-match-size {max_match_size}")
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the attendance pipeline on synthetic logs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="participant counts")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the best time is kept")
+    parser.add_argument("--time-format", choices=["iso", "zoom"], default="iso",
+                        help="timestamp layout in the generated logs")
+    parser.add_argument("--max-match-size", type=int, default=DEFAULT_MAX_MATCH_SIZE,
+                        help="skip matching above this many participants (default: never)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    time_format = synthetic.ISO_FORMAT if args.time_format == "iso" else synthetic.ZOOM_FORMAT
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="attendancify_bench_") as work_dir:
+        for size in args.sizes:
+            for row in run_scenario(size, work_dir, args.sessions, args.repeat, time_format,
+                                    args.max_match_size, args.seed):
+                results.append(row)
+                shown = "skipped" if row["seconds"] is None else f"{row['seconds']:.3f}s"
+                print(f"{size:>8} participants  {row['stage']:<14} {shown}", file=sys.stderr)
+
+    report = {"environment": environment(), "time_format": args.time_format, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
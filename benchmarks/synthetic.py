@@ -0,0 +1,117 @@
+"""Deterministic synthetic inputs: Zoom participant logs and master/raw rosters."""
+import csv
+import random
+from datetime import datetime, timedelta
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Amit", "Ananya", "Arjun", "Chen", "Daniel", "Divya", "Elena", "Fatima",
+    "Gabriel", "Hannah", "Ishaan", "Jia", "Karan", "Kavya", "Liam", "Maya", "Mohammed", "Neha",
+    "Noah", "Olivia", "Pooja", "Priya", "Rahul", "Riya", "Rohan", "Sara", "Satendra", "Sofia",
+    "Tanvi", "Vikram", "Wei", "Yusuf", "Zara", "Zoe",
+]
+LAST_NAMES = [
+    "Agarwal", "Ali", "Bose", "Chen", "Das", "Fernandes", "Garcia", "Goswami", "Gupta", "Iyer",
+    "Jain", "Khan", "Kumar", "Li", "Mehta", "Menon", "Nair", "Patel", "Reddy", "Rao",
+    "Sharma", "Singh", "Smith", "Verma", "Wang", "Williams", "Yadav",
+]
+ZOOM_HEADER = ["Name (Original Name)", "User Email", "Join Time", "Leave Time", "Duration (minutes)", "Guest"]
+ISO_FORMAT = "%Y-%m-%d %H:%M:%S"
+ZOOM_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+
+def participant_names(count, seed=0):
+    """``count`` distinct names; once the First/Last pairs run out a number is appended."""
+    rng = random.Random(seed)
+    pairs = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    rng.shuffle(pairs)
+    return [pairs[i % len(pairs)] + (f" {i // len(pairs)}" if i >= len(pairs) else "") for i in range(count)]
+
+def participant_email(name):
+    return name.lower().replace(" ", ".") + "@example.edu"
+
+def write_zoom_log(path, participants, start=datetime(2025, 3, 3, 9, 0), hours=8,
+                   max_rejoins=4, overlap_rate=0.2, time_format=ISO_FORMAT, seed=0):
+    """
+    Writes a Zoom participant export for ``participants`` people: three
+    preamble rows (which load_zoom_log skips), the header, then one row per
+    join. People rejoin up to ``max_rejoins`` times and a share of rows
+    overlap the previous one, as duplicate connections do in real exports.
+    Returns the number of data rows written.
+    """
+    rng = random.Random(seed)
+    span = hours * 3600
+    names = participant_names(participants, seed)
+    rows = []
+    for name in names:
+        email = participant_email(name) if rng.random() > 0.1 else ""
+        shown = name.upper() if rng.random() < 0.05 else name
+        t = start + timedelta(seconds=rng.randint(0, span // 4))
+        for _ in range(rng.randint(1, max_rejoins + 1)):
+            stay = rng.randint(60, span // 2)
+            leave = t + timedelta(seconds=stay)
+            if rows and rng.random() < overlap_rate:
+                overlap_join = t - timedelta(seconds=rng.randint(0, 600))
+                rows.append((shown, email, overlap_join, overlap_join + timedelta(seconds=rng.randint(30, 900))))
+            rows.append((shown, email, t, leave))
+            t = leave + timedelta(seconds=rng.randint(-120, 1800))
+    rng.shuffle(rows)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Meeting ID", "Topic", "Start Time", "End Time", "Participants"])
+        writer.writerow(["812 3456 7890", "Synthetic Workshop", start.strftime(time_format),
+                         (start + timedelta(hours=hours)).strftime(time_format), participants])
+        writer.writerow([])
+        writer.writerow(ZOOM_HEADER)
+        for name, email, join, leave in rows:
+            minutes = max(1, round((leave - join).total_seconds() / 60))
+            writer.writerow([name, email, join.strftime(time_format), leave.strftime(time_format), minutes, "No"])
+    return len(rows)
+
+def session_windows(count, start=datetime(2025, 3, 3, 9, 0), length_minutes=45, gap_minutes=10, time_required=20):
+    """``count`` back-to-back sessions in the sessions_info format."""
+    sessions = []
+    for i in range(count):
+        session_start = start + timedelta(minutes=i * (length_minutes + gap_minutes))
+        sessions.append({
+            "session_start": session_start,
+            "session_end": session_start + timedelta(minutes=length_minutes),
+            "time_required": time_required,
+        })
+    return sessions
+
+def _name_variant(name, rng):
+    parts = name.split()
+    choice = rng.random()
+    if choice < 0.4:
+        return name
+    if choice < 0.55:
+        return name.lower()
+    if choice < 0.7 and len(parts) > 1:
+        return " ".join(reversed(parts))
+    if choice < 0.85:
+        i = rng.randrange(len(name))
+        return name[:i] + name[i + 1:]
+    return name + " (" + rng.choice(["iPhone", "Laptop", "Guest"]) + ")"
+
+def write_rosters(master_path, raw_path, students, sessions=5, unmatched_rate=0.05, seed=0):
+    """
+    Writes a master roster (Email, Participant Name) and a raw attendance
+    sheet (Name plus one P/A column per session) for the matching tool.
+    Raw names are noisy variants of master names, shuffled, with a share of
+    extra names that have no master entry.
+    """
+    rng = random.Random(seed)
+    names = participant_names(students, seed)
+    with open(master_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Email", "Participant Name"])
+        for name in names:
+            writer.writerow([participant_email(name), name])
+    raw_names = [_name_variant(name, rng) for name in names if rng.random() > unmatched_rate]
+    raw_names += [f"Visitor {i}" for i in range(int(students * unmatched_rate))]
+    rng.shuffle(raw_names)
+    with open(raw_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name"] + [f"Session {i}" for i in range(1, sessions + 1)])
+        for name in raw_names:
+            writer.writerow([name] + [rng.choice("PPPA") for _ in range(sessions)])
+    return len(raw_names)
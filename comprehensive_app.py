@@ -1,19 +1,18 @@
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash, session, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, send_file, flash, session, jsonify
 import os
-import pandas as pd
 from datetime import datetime
 import io
 import tempfile
-import csv
-import re
 import zipfile
-from rapidfuzz import fuzz
 from werkzeug.utils import secure_filename
 
 # Import the core processing functions from the new module
 from attendance_processing import (
-    process_sessions_for_file, parse_datetime, write_excel
+    parse_datetime, process_attendance_file
 )
+from attendance_batch import run_batch
+from attendance_jobs import JobQueue, JobStore
+from attendance_matching import match_and_write, match_many, write_raw_excel
 
 app = Flask(__name__, static_url_path='/static', static_folder='static')
 app.secret_key = 'your_secret_key_here'  # Change this in production
@@ -21,116 +20,62 @@ app.secret_key = 'your_secret_key_here'  # Change this in production
 # Directory for temporary files
 TEMP_DIR = tempfile.gettempdir()
 
+# Parsed Zoom logs are cached here by content hash so reprocessing an upload skips parsing
+LOG_CACHE_DIR = os.path.join(TEMP_DIR, 'attendancify_log_cache')
+
 # Configure upload settings
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
+app.config['ALIAS_DIR'] = os.environ.get('ATTENDANCIFY_ALIAS_DIR', os.path.join(TEMP_DIR, 'attendancify_aliases'))  # Remembered name matches per master roster
+app.config['BATCH_WORKERS'] = int(os.environ.get('ATTENDANCIFY_WORKERS', os.cpu_count() or 1))  # Worker processes for multi-file jobs
+app.config['JOB_DIR'] = os.environ.get('ATTENDANCIFY_JOB_DIR', os.path.join(TEMP_DIR, 'attendancify_jobs'))  # Status and results of background jobs
+app.config['MAX_JOBS'] = int(os.environ.get('ATTENDANCIFY_MAX_JOBS', 1))  # Jobs run at once; each uses up to BATCH_WORKERS processes
+
+# Attendance processing runs in the background; pages poll the job store for progress
+job_store = JobStore(app.config['JOB_DIR'])
+job_queue = JobQueue(job_store, max_jobs=app.config['MAX_JOBS'], batch_workers=app.config['BATCH_WORKERS'])
 
-# ----------- Name Normalization -----------
-def normalize_name(name: str) -> str:
-    if not isinstance(name, str):
-        name = str(name)
-    name = re.sub(r"[^\w\s]", "", name)
-    name = re.sub(r"\s+", " ", name)
-    return name.strip().lower()
+# ----------- Download Helpers -----------
+ZIP_CHUNK_SIZE = 1024 * 1024
+# Members that are already compressed are stored as-is instead of deflated again
+ZIP_STORED_EXTENSIONS = ('.xlsx', '.zip')
 
-# ----------- Raw Excel Generator Functions -----------
-SHEET_NAME = "Attendance"
+class _ZipStream(io.RawIOBase):
+    """Write-only sink that hands the bytes zipfile writes back out in chunks."""
+    def __init__(self):
+        self._chunks = []
 
-def extract_raw_from_excel(xl_path):
-    # Always extract sheet named "Attendance"
-    xl = pd.ExcelFile(xl_path)
-    if SHEET_NAME not in xl.sheet_names:
-        raise ValueError(f"Sheet '{SHEET_NAME}' not found in the file.")
-    df = xl.parse(SHEET_NAME)
-    name_col = next((c for c in df.columns if str(c).strip().lower() in ("name", "participant name")), None)
-    if not name_col:
-        raise ValueError("No 'Name' column found.")
-    session_cols = [c for c in df.columns if str(df[c].dropna().unique()).strip("[]").replace("'", "").lower() in ("p, a", "p", "a")]
-    # Fallback for cases session columns have headers with "Session" or contain P/A markers
-    if not session_cols:
-        session_cols = [c for c in df.columns if "session" in str(c).lower()]
-    out = df[[name_col]+session_cols].copy()
-    out.columns = ["Name"] + [str(c) for c in session_cols]
-    # Only keep "P"/"A", replace anything else with "N/A"
-    for col in session_cols:
-        out[col] = out[col].apply(lambda x: x if str(x).strip().upper() in ("P","A") else "N/A")
-    return out
+    def writable(self):
+        return True
 
-# ----------- Attendance Matching Functions -----------
-def read_raw_file(raw_path: str) -> pd.DataFrame:
-    df = pd.read_csv(raw_path) if raw_path.lower().endswith(".csv") else pd.read_excel(raw_path)
-    df.columns = [str(c).strip() for c in df.columns]
-    name_col = next((c for c in df.columns if c.lower() in ("name", "participant name")), None)
-    if name_col is None:
-        raise ValueError("Raw file needs a 'Name' column.")
-    session_cols = [c for c in df.columns if c != name_col]
-    if not session_cols:
-        raise ValueError("Raw file contains no session/status columns.")
-    def norm(x): return x if str(x) in ("P", "A") else "N/A"
-    for col in session_cols:
-        df[col] = df[col].apply(norm)
-    out = df[[name_col] + session_cols].copy()
-    out.columns = ["Name"] + session_cols
-    return out
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
 
-def postprocess_attendance(df, session_cols):
-    # Replace P→present, A→absent (case-insensitive), but only in session columns
-    for col in session_cols:
-        df[col] = df[col].replace({"P": "present", "A": "absent", "p": "present", "a": "absent"})
-    return df
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
 
-def match_and_write(master_file: str, raw_file: str, out_fmt: str = "xlsx") -> str:
-    mdf = pd.read_csv(master_file) if master_file.lower().endswith(".csv") else pd.read_excel(master_file)
-    email_col = next((c for c in mdf.columns if str(c).strip().lower() in ("email", "email_id")), None)
-    name_col = next((c for c in mdf.columns if str(c).strip().lower() in ("participant name", "name")), None)
-    if email_col is None or name_col is None:
-        raise ValueError("Master file must have 'Email' and 'Participant Name' columns.")
-    mdf = mdf[[email_col, name_col]].copy()
-    mdf.columns = ["Email", "Participant Name"]
-    rdf = read_raw_file(raw_file)
-    session_cols = list(rdf.columns[1:])
-    raw_norm_names = [normalize_name(n) for n in list(rdf["Name"])]
-    matched_df = mdf.copy()
-    for col in session_cols:
-        matched_df[col] = "N/A"
-    threshold = 85
-    matched_indices = set()
-    for idx, row in matched_df.iterrows():
-        master_name = normalize_name(str(row["Participant Name"]))
-        best_score, best_j = -1, None
-        for j, raw_norm in enumerate(raw_norm_names):
-            score = fuzz.token_set_ratio(master_name, raw_norm)
-            if score > best_score:
-                best_score = score
-                best_j = j
-        if best_score >= threshold:
-            raw_row = rdf.iloc[best_j]
-            for col in session_cols:
-                matched_df.at[idx, col] = raw_row[col]
-            matched_indices.add(best_j)
-    unmatched_df = rdf.iloc[[i for i in range(len(rdf)) if i not in matched_indices]].copy()
-    if not unmatched_df.empty:
-        unmatched_df.rename(columns={"Name": "Raw Name (not found in Master)"}, inplace=True)
-    # ---- Here: replace P/A
-    matched_df = postprocess_attendance(matched_df, session_cols)
-    if not unmatched_df.empty:
-        unmatched_df = postprocess_attendance(unmatched_df, session_cols)
-    out_dir = os.path.dirname(master_file)
-    mbase = os.path.splitext(os.path.basename(master_file))[0]
-    rbase = os.path.splitext(os.path.basename(raw_file))[0]
-    if out_fmt == "xlsx":
-        out_path = os.path.join(out_dir, f"{mbase}_matched_with_{rbase}_attendance.xlsx")
-        with pd.ExcelWriter(out_path, engine="openpyxl") as w:
-            matched_df.to_excel(w, index=False, sheet_name="Matched")
-            if not unmatched_df.empty:
-                unmatched_df.to_excel(w, index=False, sheet_name="Unmatched Raw")
-            pd.DataFrame([], columns=["email_id", "attendance(absent/present/leave)"]).to_excel(w, index=False, sheet_name="Summary")
-        return out_path
-    prefix = os.path.join(out_dir, f"{mbase}_matched_with_{rbase}_")
-    matched_df.to_csv(prefix + "matched.csv", index=False)
-    if not unmatched_df.empty:
-        unmatched_df.to_csv(prefix + "unmatched.csv", index=False)
-    pd.DataFrame([], columns=["email_id", "attendance(absent/present/leave)"]).to_csv(prefix + "summary.csv", index=False)
-    return prefix + "matched.csv"
+def iter_zip(files):
+    """Yields a zip archive of ``files`` ({'path', 'name'} dicts) as it is built."""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w') as zipf:
+        for file_info in files:
+            member = zipfile.ZipInfo.from_file(file_info['path'], file_info['name'])
+            stored = file_info['name'].lower().endswith(ZIP_STORED_EXTENSIONS)
+            member.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            with open(file_info['path'], 'rb') as src, zipf.open(member, 'w') as dst:
+                for chunk in iter(lambda: src.read(ZIP_CHUNK_SIZE), b''):
+                    dst.write(chunk)
+                    data = stream.drain()
+                    if data:
+                        yield data
+    yield stream.drain()
+
+def send_zip(files, download_name):
+    """Streams the zip straight into the response: nothing is written to disk and each request gets its own archive."""
+    return Response(iter_zip(files), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
 
 # ----------- Routes -----------
 @app.route('/')
@@ -242,28 +187,13 @@ def process_attendance():
                 flash('Please add at least one session.')
                 return redirect(url_for('configure_attendance_sessions'))
             
-            # Process the attendance
-            output_records, session_labels, session_summary = process_sessions_for_file(file_path, sessions_info)
-            
-            # Read raw log data
-            with open(file_path, 'r', encoding='utf-8') as f:
-                sample = f.read(1024)
-                f.seek(0)
-                dialect = csv.Sniffer().sniff(sample)
-                raw_data = list(csv.reader(f, dialect))
-            raw_log_df = pd.DataFrame(raw_data)
-            
             # Create output Excel file
             output_filename = os.path.splitext(session['filename'])[0] + '_processed.xlsx'
             output_path = os.path.join(TEMP_DIR, output_filename)
             
-            write_excel(raw_log_df, output_records, output_path)
-            
-            # Store output path in session
-            session['output_path'] = output_path
-            session['output_filename'] = output_filename
-            
-            return redirect(url_for('download_attendance'))
+            # Process the attendance on the job queue and poll for it
+            tasks = {file_path: (file_path, sessions_info, output_path, LOG_CACHE_DIR)}
+            return submit_attendance_job(tasks, {file_path: session['filename']})
         else:  # multiple mode
             file_paths = session.get('file_paths', [])
             file_names = session.get('file_names', [])
@@ -320,51 +250,88 @@ def process_attendance():
                 flash('Please add at least one session.')
                 return redirect(url_for('configure_attendance_sessions'))
             
-            # Process each file
-            output_files = []
-            summary_all = {}
-            
+            # Process the files in parallel on the job queue; one failing file doesn't stop the others
+            tasks = {}
             for file_path, file_data in sessions_by_file.items():
-                file_name = file_data["file_name"]
-                sessions_info = file_data["sessions"]
-                
-                try:
-                    # Process the attendance
-                    output_records, session_labels, session_summary = process_sessions_for_file(file_path, sessions_info)
-                    
-                    # Read raw log data
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        sample = f.read(1024)
-                        f.seek(0)
-                        dialect = csv.Sniffer().sniff(sample)
-                        raw_data = list(csv.reader(f, dialect))
-                    raw_log_df = pd.DataFrame(raw_data)
-                    
-                    # Create output Excel file
-                    output_filename = os.path.splitext(file_name)[0] + '_processed.xlsx'
-                    output_path = os.path.join(TEMP_DIR, output_filename)
-                    
-                    write_excel(raw_log_df, output_records, output_path)
-                    
-                    output_files.append({
-                        'path': output_path,
-                        'name': output_filename
-                    })
-                    
-                    summary_all[file_name] = "\n".join(session_summary)
-                except Exception as e:
-                    flash(f'Error processing file {file_name}: {str(e)}')
-                    return redirect(url_for('configure_attendance_sessions'))
-            
-            # Store output files in session
-            session['attendance_output_files'] = output_files
+                output_filename = os.path.splitext(file_data["file_name"])[0] + '_processed.xlsx'
+                output_path = os.path.join(TEMP_DIR, output_filename)
+                tasks[file_path] = (file_path, file_data["sessions"], output_path, LOG_CACHE_DIR)
             
-            return redirect(url_for('download_attendance'))
+            file_names = {file_path: file_data["file_name"] for file_path, file_data in sessions_by_file.items()}
+            return submit_attendance_job(tasks, file_names)
         
     except Exception as e:
         flash(f'Error processing attendance: {str(e)}')
         return redirect(url_for('configure_attendance_sessions'))
 
+def submit_attendance_job(tasks, file_names):
+    """Queues process_attendance_file over ``tasks`` and sends the user to its progress page."""
+    job_id = job_queue.submit(process_attendance_file, tasks)
+    session['attendance_job'] = {
+        'id': job_id,
+        'files': {key: {'name': file_names[key], 'path': args[2]} for key, args in tasks.items()}
+    }
+    return redirect(url_for('attendance_job', job_id=job_id))
+
+@app.route('/attendance_job/<job_id>')
+def attendance_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        flash('Processing job not found.')
+        return redirect(url_for('attendance_generator'))
+    return render_template('attendance_job.html', job=job, show_navigation=True)
+
+@app.route('/attendance_job/<job_id>/status')
+def attendance_job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify({
+        'id': job['id'],
+        'status': job['status'],
+        'done': job['done'],
+        'total': job['total'],
+        'error': job['error'],
+        'failed': sum(not result['ok'] for result in job['results']),
+        'finish_url': url_for('finish_attendance_job', job_id=job_id)
+    })
+
+@app.route('/attendance_job/<job_id>/finish')
+def finish_attendance_job(job_id):
+    job = job_store.get(job_id)
+    job_info = session.get('attendance_job')
+    if job is None or not job_info or job_info['id'] != job_id:
+        flash('Processing job not found.')
+        return redirect(url_for('attendance_generator'))
+    if job['status'] not in ('done', 'failed'):
+        return redirect(url_for('attendance_job', job_id=job_id))
+    if job['status'] == 'failed':
+        flash(f"Error processing attendance: {job['error']}")
+        return redirect(url_for('configure_attendance_sessions'))
+    
+    output_files = []
+    for result in job['results']:
+        file_info = job_info['files'][result['key']]
+        if not result['ok']:
+            flash(f"Error processing file {file_info['name']}: {result['error']}")
+            continue
+        output_files.append({
+            'path': file_info['path'],
+            'name': os.path.basename(file_info['path'])
+        })
+    
+    if not output_files:
+        return redirect(url_for('configure_attendance_sessions'))
+    
+    # Store output paths in session for the download route
+    if session.get('mode', 'single') == 'single':
+        session['output_path'] = output_files[0]['path']
+        session['output_filename'] = output_files[0]['name']
+    else:
+        session['attendance_output_files'] = output_files
+    
+    return redirect(url_for('download_attendance'))
+
 @app.route('/download_attendance')
 def download_attendance():
     mode = session.get('mode', 'single')
@@ -414,27 +381,28 @@ def process_raw_excel():
             flash('No files selected')
             return redirect(url_for('raw_excel_generator'))
         
-        # Process each file
-        output_files = []
+        # Save each file, then extract and write them on the worker pool
+        tasks = {}
         for file in files:
             if file.filename:
-                # Save file temporarily
                 filename = secure_filename(file.filename)
                 file_path = os.path.join(TEMP_DIR, filename)
                 file.save(file_path)
-                
-                # Process the file
-                raw_df = extract_raw_from_excel(file_path)
-                
-                # Create output file
                 output_filename = os.path.splitext(filename)[0] + '-RAW.xlsx'
-                output_path = os.path.join(TEMP_DIR, output_filename)
-                raw_df.to_excel(output_path, index=False)
-                
-                output_files.append({
-                    'path': output_path,
-                    'name': output_filename
-                })
+                tasks[filename] = (file_path, os.path.join(TEMP_DIR, output_filename))
+        
+        output_files = []
+        for result in run_batch(write_raw_excel, tasks, max_workers=app.config['BATCH_WORKERS']):
+            if not result.ok:
+                flash(f'Error processing file {result.key}: {result.error}')
+                continue
+            output_files.append({
+                'path': result.value,
+                'name': os.path.basename(result.value)
+            })
+        
+        if not output_files:
+            return redirect(url_for('raw_excel_generator'))
         
         # Store output files in session
         session['raw_output_files'] = output_files
@@ -465,15 +433,8 @@ def download_raw_excel():
         file_info = output_files[0]
         return send_file(file_info['path'], as_attachment=True, download_name=file_info['name'])
     else:
-        # Create a zip file with all outputs
-        zip_filename = 'raw_excel_files.zip'
-        zip_path = os.path.join(TEMP_DIR, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for file_info in output_files:
-                zipf.write(file_info['path'], file_info['name'])
-        
-        return send_file(zip_path, as_attachment=True, download_name=zip_filename)
+        # Stream a zip of all outputs
+        return send_zip(output_files, 'raw_excel_files.zip')
 
 # ----------- Attendance Matching Routes -----------
 @app.route('/attendance_matching')
@@ -493,6 +454,7 @@ def process_attendance_matching():
         
         # Get output format
         output_format = request.form.get('output_format', 'xlsx')
+        assignment = request.form.get('assignment', 'best')
         
         # Save master files
         master_file_paths = []
@@ -518,19 +480,20 @@ def process_attendance_matching():
         
         # Process file pairs
         output_files = []
+        alias_dir = app.config['ALIAS_DIR']
         
-        # Match files by index (first master with first raw, etc.)
-        max_pairs = min(len(master_file_paths), len(raw_file_paths))
+        if len(master_file_paths) == 1 and len(raw_file_paths) > 1:
+            # One master against every raw file: the roster is read and indexed once
+            consolidated = request.form.get('consolidated') == 'on'
+            output_paths = match_many(master_file_paths[0], raw_file_paths, output_format, assignment,
+                                      alias_dir, consolidated)
+        else:
+            # Match files by index (first master with first raw, etc.)
+            max_pairs = min(len(master_file_paths), len(raw_file_paths))
+            output_paths = [match_and_write(master_file_paths[i], raw_file_paths[i], output_format, assignment, alias_dir)
+                            for i in range(max_pairs)]
         
-        for i in range(max_pairs):
-            master_path = master_file_paths[i]
-            master_name = master_file_names[i]
-            raw_path = raw_file_paths[i]
-            raw_name = raw_file_names[i]
-            
-            # Process the matching
-            output_path = match_and_write(master_path, raw_path, output_format)
-            
+        for output_path in output_paths:
             output_files.append({
                 'path': output_path,
                 'name': os.path.basename(output_path)
@@ -565,15 +528,8 @@ def download_attendance_matching():
         file_info = output_files[0]
         return send_file(file_info['path'], as_attachment=True, download_name=file_info['name'])
     else:
-        # Create a zip file with all outputs
-        zip_filename = 'matching_results.zip'
-        zip_path = os.path.join(TEMP_DIR, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for file_info in output_files:
-                zipf.write(file_info['path'], file_info['name'])
-        
-        return send_file(zip_path, as_attachment=True, download_name=zip_filename)
+        # Stream a zip of all outputs
+        return send_zip(output_files, 'matching_results.zip')
 
 if __name__ == '__main__':
     print("Starting Attendance Tools Suite...")